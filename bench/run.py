@@ -0,0 +1,306 @@
+"""
+Mesures de débit des chemins critiques de la simulation et de
+l'apprentissage.
+
+Chaque mesure est rejouée avec la même graine : deux exécutions sur la
+même machine font exactement le même travail. Les résultats (µs par
+appel et appels par seconde, pour chaque taille de plateau et longueur
+de serpent) sont écrits en JSON pour être comparés entre deux commits :
+
+    python -m bench.run --output before.json
+    python -m bench.run --output after.json --compare before.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from src.board import Board, EMPTY, SNAKE, ACTIONS
+from src.game import Game
+from src.q_agent import QLearningAgent
+from src.seeding import AGENT_STREAM, BOARD_STREAM, derive_seed, make_rng
+from src.snake import Snake
+
+SIZES = (5, 10, 20, 40)
+REWARDS = {"green_apple": 50, "red_apple": -45,
+           "move_without_eating": -1, "collision": -100}
+
+
+def snake_path(size, length):
+    """
+    Corps d'un serpent de `length` cases qui parcourt le plateau en
+    serpentin depuis le coin (0, 0), tête en premier.
+    """
+    path = []
+    for x in range(size):
+        row = range(size) if x % 2 == 0 else range(size - 1, -1, -1)
+        path.extend((x, y) for y in row)
+    return path[:length][::-1]
+
+
+def make_board(size, length, victory_condition, rng):
+    """Plateau avec un serpent de la longueur demandée et ses pommes."""
+    board = Board(size, victory_condition=victory_condition, rewards=REWARDS,
+                  rng=rng)
+    for pos in list(board.snake.get_body()) + board.green_apples + \
+            board.red_apples:
+        board.set_cell(pos, EMPTY)
+    body = snake_path(size, length)
+    board.snake = Snake(body, size)
+    for pos in body:
+        board.set_cell(pos, SNAKE)
+    if length > 1:
+        board.direction = (body[0][0] - body[1][0], body[0][1] - body[1][1])
+    board.generate_apples()
+    return board
+
+
+def lengths_for(size, victory_condition):
+    """Longueurs de serpent mesurées pour une taille de plateau."""
+    longest = min(victory_condition, size * size - 4)
+    return sorted({3, max(3, longest // 2), longest})
+
+
+def time_calls(function, calls, repeat):
+    """
+    Meilleur temps moyen d'un appel sur `repeat` séries de `calls`
+    appels, en nanosecondes.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            function()
+        elapsed = (time.perf_counter_ns() - start) / calls
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_each(step, calls, repeat):
+    """
+    Comme time_calls pour une fonction qui modifie son état :
+    `step()` prépare l'appel sans être chronométrée et retourne la
+    fonction à chronométrer.
+    """
+    best = None
+    for _ in range(repeat):
+        total = 0
+        for _ in range(calls):
+            function = step()
+            start = time.perf_counter_ns()
+            function()
+            total += time.perf_counter_ns() - start
+        best = total / calls if best is None else min(best, total / calls)
+    return best
+
+
+def bench_board(size, length, victory_condition, calls, repeat, seed):
+    """Mesures de Board pour une taille et une longueur de serpent."""
+    results = {}
+
+    board = make_board(size, length, victory_condition, random.Random(seed))
+    results["Board.get_vision"] = time_calls(board.get_vision, calls, repeat)
+
+    board = make_board(size, length, victory_condition, random.Random(seed))
+
+    def apple_step():
+        # Retirer la pomme ajoutée à l'appel précédent
+        if len(board.green_apples) > 2:
+            board.set_cell(board.green_apples.pop(), EMPTY)
+        return lambda: board.generate_apple("green")
+    results["Board.generate_apple"] = time_each(apple_step, calls, repeat)
+
+    rng = random.Random(seed)
+    state = {"board": make_board(size, length, victory_condition, rng)}
+
+    def move_step():
+        board = state["board"]
+        free = [action for action, blocked
+                in zip(ACTIONS, board.blocked_directions()) if not blocked]
+        if not free or len(board.snake.get_body()) != length:
+            # Serpent bloqué ou qui a changé de taille : repartir
+            board = state["board"] = make_board(size, length,
+                                                victory_condition, rng)
+            free = [action for action, blocked
+                    in zip(ACTIONS, board.blocked_directions())
+                    if not blocked] or ACTIONS
+        action = rng.choice(free)
+        return lambda: board.move_snake(action)
+    results["Board.move_snake"] = time_each(move_step, calls, repeat)
+    return results
+
+
+def bench_agent(size, length, victory_condition, calls, repeat, seed):
+    """Mesures de QLearningAgent pour une taille et une longueur."""
+    results = {}
+    agent = QLearningAgent(size, ACTIONS, REWARDS, rng=random.Random(seed))
+    board = make_board(size, length, victory_condition, random.Random(seed))
+    vision = board.get_vision()
+    free = [action for action, blocked
+            in zip(ACTIONS, board.blocked_directions()) if not blocked]
+    board.move_snake(free[0] if free else ACTIONS[0])
+    next_vision = board.get_vision()
+
+    results["QLearningAgent.get_global_state"] = time_calls(
+        lambda: agent.get_global_state(vision), calls, repeat)
+    results["QLearningAgent.get_resized_vision"] = time_calls(
+        lambda: agent.get_resized_vision(vision), calls, repeat)
+    # Sans exploration, pour mesurer toujours le même chemin
+    agent.epsilon = 0.0
+    results["QLearningAgent.choose_action"] = time_calls(
+        lambda: agent.choose_action(vision), calls, repeat)
+    results["QLearningAgent.update_q_value"] = time_calls(
+        lambda: agent.update_q_value(vision, ACTIONS[0], -1, next_vision),
+        calls, repeat)
+    return results
+
+
+def bench_episode(size, victory_condition, episodes, repeat, seed):
+    """
+    Parties complètes sans affichage avec apprentissage.
+    :return: Dictionnaire (ns par partie, ns par pas).
+    """
+    best_episode = best_step = None
+    for _ in range(repeat):
+        agent = QLearningAgent(size, ACTIONS, REWARDS,
+                               rng=make_rng(seed, 0, AGENT_STREAM))
+        game = Game(size, display=False, victory_condition=victory_condition,
+                    mode="train", rewards=REWARDS,
+                    seed=derive_seed(seed, 0, BOARD_STREAM))
+        steps = [0]
+        select_action = agent.select_action
+
+        def counted(state, blocked):
+            steps[0] += 1
+            return select_action(state, blocked)
+        agent.select_action = counted
+
+        start = time.perf_counter_ns()
+        for _ in range(episodes):
+            game.reset()
+            game.run(step=False, agent=agent, train=True)
+            agent.decay_epsilon()
+        elapsed = time.perf_counter_ns() - start
+        per_episode = elapsed / episodes
+        per_step = elapsed / max(1, steps[0])
+        best_episode = (per_episode if best_episode is None
+                        else min(best_episode, per_episode))
+        best_step = (per_step if best_step is None
+                     else min(best_step, per_step))
+    return {"Game.run/episode": best_episode, "Game.run/step": best_step}
+
+
+def entry(nanoseconds):
+    return {"us_per_call": round(nanoseconds / 1000, 3),
+            "calls_per_s": round(1e9 / nanoseconds, 1) if nanoseconds else 0}
+
+
+def run_benchmarks(sizes=SIZES, victory_condition=35, calls=2000, repeat=5,
+                   episodes=50, seed=0):
+    """
+    Lance toutes les mesures.
+    :return: Dictionnaire {"meta": ..., "results": {nom: mesure}} où
+    nom vaut "<fonction>/size=<taille>[/length=<longueur>]".
+    """
+    results = {}
+    # Les messages des parties fausseraient les mesures
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for size in sizes:
+            for length in lengths_for(size, victory_condition):
+                measures = bench_board(size, length, victory_condition,
+                                       calls, repeat, seed)
+                measures.update(bench_agent(size, length, victory_condition,
+                                            calls, repeat, seed))
+                for name, value in measures.items():
+                    results[f"{name}/size={size}/length={length}"] = \
+                        entry(value)
+            for name, value in bench_episode(size, victory_condition,
+                                             episodes, repeat, seed).items():
+                results[f"{name}/size={size}"] = entry(value)
+    meta = {"python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": seed, "calls": calls, "repeat": repeat,
+            "episodes": episodes, "victory_condition": victory_condition}
+    return {"meta": meta, "results": results}
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare deux résultats.
+    :param threshold: Ralentissement relatif toléré (0.1 = 10 %).
+    :return: Liste de (nom, µs avant, µs après, variation) des mesures
+    ralenties au-delà du seuil.
+    """
+    regressions = []
+    for name, measure in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or not before["us_per_call"]:
+            continue
+        change = measure["us_per_call"] / before["us_per_call"] - 1
+        if change > threshold:
+            regressions.append((name, before["us_per_call"],
+                                measure["us_per_call"], change))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mesures de débit de la simulation et de "
+                    "l'apprentissage.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="Tailles de plateau mesurées.")
+    parser.add_argument("--victory", type=int, default=35,
+                        help="Longueur de victoire (longueur maximale "
+                             "du serpent mesurée).")
+    parser.add_argument("--calls", type=int, default=2000,
+                        help="Appels par série.")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Séries par mesure (la meilleure est gardée).")
+    parser.add_argument("--episodes", type=int, default=50,
+                        help="Parties par série pour Game.run.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="Fichier JSON des résultats (défaut : "
+                             "sortie standard).")
+    parser.add_argument("--compare", default=None, metavar="BASELINE",
+                        help="Résultats JSON de référence.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Ralentissement toléré avant d'échouer "
+                             "(0.1 = 10 %%).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args.sizes, args.victory, args.calls,
+                            args.repeat, args.episodes, args.seed)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for name, measure in report["results"].items():
+        print(f"{name:65} {measure['us_per_call']:>10.2f} µs "
+              f"{measure['calls_per_s']:>12.0f}/s", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"Régression : {name} {before:.2f} -> {after:.2f} µs "
+                  f"(+{change:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print("Aucune régression.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,11 @@
-import yaml
 import pygame
 from src.game import Game
 from src.q_agent import QLearningAgent
-
-
-def load_config(config_file="config.yaml"):
-    """Charge la configuration depuis config.yaml."""
-    with open(config_file, "r") as file:
-        return yaml.safe_load(file)
+from src.seeding import derive_seed
+from src.profiling import run_profiled
+from src.render import RenderPolicy
+from src.trace import TraceWriter
+from src.train import load_config, make_timer, train_agent
 
 
 def show_lobby(screen, config):
@@ -268,16 +266,6 @@ def modify_config(config, index, decrement):
         config['rewards']['move_without_eating'] += -1 if decrement else 1
 
 
-def means_calcul(length, score, session):
-    if session == 0:
-        raise ValueError("Le nombre de sessions ne peut pas être 0.")
-
-    mean_length = round(length / session, 2)
-    mean_score = round(score / session, 2)
-
-    return mean_length, mean_score
-
-
 def main():
     """
     Fonction principale pour initialiser et exécuter le programme.
@@ -298,78 +286,68 @@ def main():
     display = local_config.get("display", True)
     victory_condition = local_config.get("victory_condition", 10)
     rewards = local_config["rewards"]
-    training_sessions = local_config["training"]["sessions"]
-    model_name = local_config["model"]["name"]
-    s_b_s = local_config.get("step_by_step", False)
 
-    # Initialiser les actions et l'agent
-    actions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    agent = QLearningAgent(board_size, actions, rewards)
+    # Initialiser l'agent
+    agent = QLearningAgent.from_config(local_config)
 
     # Initialiser le jeu
-    game = Game(board_size, display, speed, victory_condition, mode)
+    render = local_config.get("render") or {}
+    game = Game(board_size, display, speed, victory_condition, mode,
+                rewards=rewards, seed=derive_seed(local_config.get("seed")),
+                text_cache_size=render.get("text_cache_size", 256),
+                render_policy=RenderPolicy.from_config(render),
+                end_screen_seconds=render.get("end_screen_seconds", 5.0))
+
+    # Enregistrement des parties (section trace)
+    trace_path = (local_config.get("trace") or {}).get("path")
+    if trace_path:
+        game.trace_writer = TraceWriter(trace_path)
+
+    # Mesure du temps par phase et profilage (section profiling)
+    profiling = local_config.get("profiling") or {}
+    timer = make_timer(local_config)
+    if profiling.get("profile"):
+        run_profiled(profiling["profile"], play, game, agent, mode,
+                     local_config, timer)
+    else:
+        play(game, agent, mode, local_config, timer)
+    if timer is not None and profiling.get("timing_output"):
+        timer.save(profiling["timing_output"])
+    if game.trace_writer is not None:
+        game.trace_writer.close()
+
+
+def play(game, agent, mode, config, timer=None):
+    """
+    Lance le mode choisi dans le lobby.
+    :param timer: PhaseTimer optionnel (voir src.profiling).
+    """
+    training_sessions = config["training"]["sessions"]
+    model_name = config["model"]["name"]
+    s_b_s = config.get("step_by_step", False)
 
     if mode == "player":
         game.run(step=s_b_s)
     elif mode == "train":
-        # Charger l'état actuel si disponible
-        try:
-            agent.load_model(model_name)
-            print("Modèle chargé à partir de la sauvegarde actuelle.")
-        except FileNotFoundError:
-            print("Aucun modèle actuel trouvé, démarrage à partir de zéro.")
-        total_length = 0
-        total_score = 0
-        means_length = 0
-        means_score = 0
-        # Boucle d'entraînement
-        for session in range(1, training_sessions + 1):
-            game.reset()
-            print(f"Début de la session {session}/{training_sessions}")
-            if display:
-                length, score = game.run(
-                    step=s_b_s,
-                    agent=agent,
-                    train=True,
-                    current_session=session,
-                    total_sessions=training_sessions,
-                    means_score=means_score,
-                    means_length=means_length,
-                )
-                total_length += length
-                total_score += score
-                means_length, means_score = means_calcul(total_length,
-                                                         total_score, session)
-            else:
-                game.run(
-                    step=s_b_s,
-                    agent=agent,
-                    train=True,
-                    current_session=session,
-                    total_sessions=training_sessions
-                )
-
-            # Sauvegarder le modèle pour la session actuelle
-            agent.save_model(model_name)
-
-            # Sauvegarder les modèles spécifiques pour les sessions importantes
-            if session in {1, 10, 100}:
-                agent.save_model(f"{model_name}_{session}_sessions.pkl")
-            agent.decay_epsilon()
-            print(f"\nSession terminée. Nouvelle valeur "
-                  f"d'epsilon : {agent.epsilon}\n")
+        train_agent(game, agent, training_sessions, model_name, step=s_b_s,
+                    checkpoint=config.get("checkpoint"), timer=timer)
     elif mode == "model":
         agent.epsilon = 0.0
         try:
-            agent.load_model(model_name)
+            agent.load_model(model_name, read_only=True)
             print(f"Modèle {model_name} chargé.")
         except FileNotFoundError:
             print(f"Erreur : Modèle {model_name} introuvable.")
             return
 
+        if timer is not None:
+            game.timer = timer
         game.run(step=s_b_s, agent=agent, train=False)
+        if timer is not None:
+            print(timer.report())
     else:
         print("Mode invalide.")
+    game.wait_end_screen()
 
 
 if __name__ == "__main__":
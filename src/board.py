@@ -1,23 +1,143 @@
+from functools import lru_cache
+from src.profiling import NULL_TIMER
 from src.snake import Snake
 import random
 
+# Codes des cases de la grille d'occupation
+EMPTY = 0
+SNAKE = 1
+GREEN = 2
+RED = 3
+WALL = 4
+
+# Actions possibles : haut, bas, gauche, droite
+ACTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Caractère de vision associé à chaque code
+CELL_CHARS = "0SGRW"
+
+# Récompenses utilisées quand aucune n'est fournie
+DEFAULT_REWARDS = {
+    "green_apple": 10,
+    "red_apple": -5,
+    "move_without_eating": -1,
+    "collision": -50,
+}
+
+# Conversion code -> caractère pour get_state() et get_vision()
+_STATE_TABLE = bytes.maketrans(bytes(range(5)), b" SGR ")
+VISION_TABLE = bytes.maketrans(bytes(range(5)), CELL_CHARS.encode())
+
+# Cases qui bloquent un déplacement
+_BLOCKING = (SNAKE, WALL)
+
+
+@lru_cache(maxsize=None)
+def ray_slices(size):
+    """
+    Table des rayons pour un plateau de taille donnée, construite une
+    seule fois par taille et partagée par tous les plateaux.
+    Pour chaque indice de la grille à plat (bordure comprise), un tuple
+    de quatre `slice` (haut, bas, gauche, droite) qui sélectionnent, dans
+    l'ordre, les cases du rayon jusqu'au mur inclus. None pour la bordure.
+    """
+    width = size + 2
+    table = [None] * (width * width)
+    for x in range(size):
+        for y in range(size):
+            idx = (x + 1) * width + y + 1
+            table[idx] = (
+                slice(idx - width, y, -width),        # haut
+                slice(idx + width, None, width),      # bas
+                slice(idx - 1, (x + 1) * width - 1, -1),  # gauche
+                slice(idx + 1, (x + 2) * width),      # droite
+            )
+    return tuple(table)
+
 
 class Board:
-    def __init__(self, size=10, victory_condition=10, rewards=None):
+    def __init__(self, size=10, victory_condition=10, rewards=None,
+                 rng=None):
+        """
+        :param size: Taille du plateau.
+        :param victory_condition: Longueur du serpent pour la victoire.
+        :param rewards: Dictionnaire des récompenses.
+        :param rng: Générateur (random.Random) du serpent initial et des
+        pommes ; par défaut le module random (état global).
+        """
         self.size = size
+        self.rng = rng if rng is not None else random
         self.victory_condition = victory_condition
-        self.rewards = rewards or {
-            "green_apple": 10,
-            "red_apple": -5,
-            "move_without_eating": -1,
-            "collision": -50,
-        }
+        self.rewards = rewards or dict(DEFAULT_REWARDS)
+        # Grille d'occupation à plat entourée d'une bordure de murs :
+        # la case (x, y) est à l'indice (x + 1) * width + (y + 1)
+        self.width = size + 2
+        self.grid = bytearray([WALL]) * (self.width * self.width)
+        self.rays = ray_slices(size)
+        # Index des cases libres : liste des indices libres et, pour
+        # chaque indice, sa place dans la liste (-1 si occupé), ce qui
+        # permet ajout et retrait en O(1) par échange avec le dernier
+        self.free_cells = []
+        self.free_slot = [-1] * len(self.grid)
+        for x in range(size):
+            start = self.index(x, 0)
+            self.grid[start:start + size] = bytes(size)
+            for idx in range(start, start + size):
+                self.free_slot[idx] = len(self.free_cells)
+                self.free_cells.append(idx)
         self.snake, self.direction = self.generate_snake()
+        for pos in self.snake.get_body():
+            self.set_cell(pos, SNAKE)
         self.green_apples = []
         self.red_apples = []
         self.score = 0
         self.generate_apples()
         self.recent_positions = []
+        # Informations du dernier pas, réutilisées d'un pas à l'autre
+        self.info = {"result": None, "victory": False,
+                     "length": len(self.snake.get_body()),
+                     "blocked": self.blocked_directions()}
+
+    def index(self, x, y):
+        """Retourne l'indice de la case (x, y) dans la grille à plat."""
+        return (x + 1) * self.width + y + 1
+
+    def position(self, idx):
+        """Retourne la case (x, y) correspondant à un indice de la grille."""
+        x, y = divmod(idx, self.width)
+        return x - 1, y - 1
+
+    def set_cell(self, pos, code):
+        """
+        Met à jour le code d'une case de la grille d'occupation
+        et l'index des cases libres.
+        :param pos: Tuple (x, y) de la case.
+        :param code: EMPTY, SNAKE, GREEN ou RED.
+        """
+        idx = self.index(*pos)
+        previous = self.grid[idx]
+        self.grid[idx] = code
+        if code == EMPTY and previous != EMPTY:
+            self.free_slot[idx] = len(self.free_cells)
+            self.free_cells.append(idx)
+        elif code != EMPTY and previous == EMPTY:
+            # Retrait par échange avec le dernier élément
+            slot = self.free_slot[idx]
+            last = self.free_cells.pop()
+            if last != idx:
+                self.free_cells[slot] = last
+                self.free_slot[last] = slot
+            self.free_slot[idx] = -1
+
+    def random_free_cell(self):
+        """
+        Tire une case libre au hasard en O(1).
+        :return: Tuple (x, y), ou None si le plateau est plein.
+        """
+        if not self.free_cells:
+            return None
+        idx = self.free_cells[self.rng.randrange(len(self.free_cells))]
+        return self.position(idx)
 
     def is_valid_head_position(self, x, y):
         """Vérifie que la position de la tête n'est pas
@@ -39,12 +159,12 @@ class Board:
         retourne également la direction initiale.
         """
         while True:
-            x = random.randint(1, self.size - 2)
-            y = random.randint(1, self.size - 2)
+            x = self.rng.randint(1, self.size - 2)
+            y = self.rng.randint(1, self.size - 2)
 
             if self.is_valid_head_position(x, y):
                 directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]
-                random.shuffle(directions)
+                self.rng.shuffle(directions)
 
                 for direction in directions:
                     snake_body = [(x, y), (x + direction[0], y + direction[1]),
@@ -63,39 +183,30 @@ class Board:
         """
         Génère des pommes sur des cases libres.
         """
-        all_positions = set((x, y) for x in range(self.size)
-                            for y in range(self.size))
-        occupied_positions = set(tuple(pos) for pos in self.snake.get_body())
-        free_positions = list(all_positions - occupied_positions)
-
-        self.green_apples = random.sample(free_positions, 2)
-        free_positions = list(set(free_positions) - set(self.green_apples))
-        self.red_apples = random.sample(free_positions, 1)
+        self.green_apples = []
+        self.red_apples = []
+        for _ in range(2):
+            self.generate_apple("green")
+        self.generate_apple("red")
 
     def generate_apple(self, apple_type):
         """
         Génère une pomme unique sur une case libre, uniquement
         pour remplacer la pomme mangée.
         :param apple_type: Le type de la pomme à générer ("green" ou "red").
+        :return: Position de la nouvelle pomme, ou None si
+        le plateau est plein.
         """
-        # Générer toutes les positions possibles du plateau
-        all_positions = set((x, y) for x in range(self.size)
-                            for y in range(self.size))
-
-        # Positions occupées par le serpent et les pommes existantes
-        occupied_positions = set(self.snake.get_body() +
-                                 self.green_apples + self.red_apples)
-
-        # Cases libres
-        free_positions = list(all_positions - occupied_positions)
-
-        # Vérifier qu'il reste des cases libres
-        if free_positions:
-            new_apple = random.choice(free_positions)
-            if apple_type == "green":
-                self.green_apples.append(new_apple)
-            elif apple_type == "red":
-                self.red_apples.append(new_apple)
+        new_apple = self.random_free_cell()
+        if new_apple is None:
+            return None
+        if apple_type == "green":
+            self.green_apples.append(new_apple)
+            self.set_cell(new_apple, GREEN)
+        elif apple_type == "red":
+            self.red_apples.append(new_apple)
+            self.set_cell(new_apple, RED)
+        return new_apple
 
     def move_snake(self, direction):
         """
@@ -103,28 +214,45 @@ class Board:
         les interactions avec les pommes.
         """
         self.direction = direction
-        self.snake.move(direction, grow=False)
+        body = self.snake.get_body()
+        head_x, head_y = body[0]
+        new_head = (head_x + direction[0], head_y + direction[1])
+        cell = self.grid[self.index(*new_head)]
+
+        # Collision avec un mur ou le corps (queue comprise)
+        if cell == WALL or cell == SNAKE:
+            self.snake.alive = False
+            # print("Game Over!")
+            return False
 
+        old_tail = body[-1]
+        self.snake.move(direction, grow=False)
         if not self.snake.is_alive():
-            # print("Game Over!")
             return False
 
+        # La queue ne libère sa case que si elle n'était pas dupliquée
+        if not self.snake.occupies(old_tail):
+            self.set_cell(old_tail, EMPTY)
+        self.set_cell(new_head, SNAKE)
+
         # Gestion des pommes
-        new_head = self.snake.get_body()[0]
-        if new_head in self.green_apples:
+        if cell == GREEN:
             print("Pomme verte mangée.")
             self.green_apples.remove(new_head)
             self.snake.grow_at_tail()
             # self.snake.move(direction, grow=True)  # Le serpent grandit
             self.generate_apple("green")  # Générer une nouvelle pomme verte
             return "green"
-        elif new_head in self.red_apples:
+        elif cell == RED:
             print("Pomme rouge mangée.")
             self.red_apples.remove(new_head)
+            old_tail = body[-1]
             self.snake.shrink()  # Rétrécit
             if not self.snake.is_alive():
                 print("Le serpent est mort après avoir mangé une pomme rouge.")
                 return False
+            if not self.snake.occupies(old_tail):
+                self.set_cell(old_tail, EMPTY)
             self.generate_apple("red")  # Générer une nouvelle pomme rouge
             return "red"
         return True
@@ -132,20 +260,47 @@ class Board:
     def get_state(self):
         """
         Retourne l'état actuel du plateau (serpent et pommes).
+        Chaque ligne est une chaîne où " " est une case vide,
+        "S" le serpent, "G" une pomme verte et "R" une pomme rouge.
         """
-        state = [[" " for _ in range(self.size)] for _ in range(self.size)]
+        rows = bytes(self.grid).translate(_STATE_TABLE).decode()
+        return [rows[self.index(x, 0):self.index(x, 0) + self.size]
+                for x in range(self.size)]
 
-        for x, y in self.snake.get_body():
-            if 0 <= x < self.size and 0 <= y < self.size:
-                state[x][y] = "S"
-        for x, y in self.green_apples:
-            if 0 <= x < self.size and 0 <= y < self.size:
-                state[x][y] = "G"
-        for x, y in self.red_apples:
-            if 0 <= x < self.size and 0 <= y < self.size:
-                state[x][y] = "R"
+    def get_rays(self):
+        """
+        Retourne les codes des cases vues depuis la tête dans les 4
+        directions (haut, bas, gauche, droite), mur final compris.
+        :return: Tuple de quatre bytearray.
+        """
+        grid = self.grid
+        up, down, left, right = self.rays[self.index(
+            *self.snake.get_body()[0])]
+        return grid[up], grid[down], grid[left], grid[right]
 
-        return state
+    def blocked_directions(self):
+        """
+        Indique pour chaque direction (haut, bas, gauche, droite) si la
+        case voisine de la tête est un mur ou le corps du serpent.
+        :return: Tuple de quatre booléens.
+        """
+        grid = self.grid
+        head = self.index(*self.snake.get_body()[0])
+        return (grid[head - self.width] in _BLOCKING,
+                grid[head + self.width] in _BLOCKING,
+                grid[head - 1] in _BLOCKING,
+                grid[head + 1] in _BLOCKING)
+
+    def observe(self, encode=None):
+        """
+        Retourne l'observation courante sans construire de dictionnaire
+        de vision.
+        :param encode: Fonction appliquée aux rayons (par exemple
+        QLearningAgent.get_state_from_rays). Sans elle, les rayons bruts
+        de get_rays() sont retournés.
+        """
+        rays = self.get_rays()
+        return encode(rays) if encode else rays
 
     def get_vision(self):
         """
@@ -154,36 +309,11 @@ class Board:
         Retourne un dictionnaire indiquant
         la vision complète dans chaque direction.
         """
-        vision = {"up": [], "down": [], "left": [], "right": []}
-        head_x, head_y = self.snake.get_body()[0]
-
-        directions = {
-            "up": (-1, 0),
-            "down": (1, 0),
-            "left": (0, -1),
-            "right": (0, 1)
-        }
-
-        for dir_name, (dx, dy) in directions.items():
-            x, y = head_x, head_y
-            while True:
-                x += dx
-                y += dy
-                # Vérifier les limites du plateau
-                if not (0 <= x < self.size and 0 <= y < self.size):
-                    vision[dir_name].append("W")
-                    break
-                # Vérifier si c'est une pomme verte
-                elif (x, y) in self.green_apples:
-                    vision[dir_name].append("G")
-                # Vérifier si c'est une pomme rouge
-                elif (x, y) in self.red_apples:
-                    vision[dir_name].append("R")
-                # Vérifier si c'est une partie du corps
-                elif (x, y) in self.snake.get_body():
-                    vision[dir_name].append("S")
-                else:
-                    vision[dir_name].append("0")  # Case vide
+        up, down, left, right = [
+            list(ray.translate(VISION_TABLE).decode("ascii"))
+            for ray in self.get_rays()
+        ]
+        vision = {"up": up, "down": down, "left": left, "right": right}
         # self.print_vision(vision)
         return vision
 
@@ -260,6 +390,42 @@ class Board:
 
         return reward
 
+    def step(self, action, encode=None, timer=NULL_TIMER):
+        """
+        Joue un pas complet : déplacement, récompense et observation
+        suivante, en un seul appel.
+        :param action: Direction (dx, dy) choisie.
+        :param encode: Fonction d'encodage des rayons (voir observe()).
+        :param timer: PhaseTimer mesurant chaque phase (déplacement,
+        récompense, vision, encodage) ; NULL_TIMER ne mesure rien.
+        :return: Tuple (état suivant, récompense, terminé, info) où info
+        est un dictionnaire réutilisé contenant "result" (comme
+        move_snake), "victory", "length" et "blocked".
+        """
+        start = timer.start()
+        self.update_direction(action)
+        result = self.move_snake(action)
+        start = timer.stop("move", start)
+        reward = self.calculate_reward(result)
+        start = timer.stop("reward", start)
+        info = self._step_info(result)
+        rays = self.get_rays()
+        start = timer.stop("vision", start)
+        state = encode(rays) if encode else rays
+        timer.stop("encoding", start)
+        return state, reward, not result or info["victory"], info
+
+    def _step_info(self, result):
+        """Remplit le dictionnaire d'informations du pas."""
+        length = len(self.snake.get_body())
+        info = self.info
+        info["result"] = result
+        info["victory"] = (result is not False and
+                           length >= self.victory_condition)
+        info["length"] = length
+        info["blocked"] = self.blocked_directions()
+        return info
+
     def is_victory(self):
         """
         Vérifie si la longueur du serpent atteint
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Cache borné : au-delà de la capacité, l'entrée utilisée le moins
+    récemment est évincée. Compte les succès, échecs et évictions.
+    """
+
+    def __init__(self, capacity=65536):
+        """
+        :param capacity: Nombre maximal d'entrées (0 désactive le cache).
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """
+        Retourne la valeur associée à la clé et la marque comme récente,
+        ou `default` si la clé est absente.
+        """
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Ajoute une entrée en évinçant la plus ancienne si nécessaire."""
+        if self.capacity <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vide le cache et remet les compteurs à zéro."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache.
+        :return: Dictionnaire (hits, misses, evictions, size, hit_rate).
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
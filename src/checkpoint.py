@@ -0,0 +1,369 @@
+"""
+Sauvegarde du modèle en arrière-plan.
+
+L'entraînement ne fait que copier la Q-table (quelques copies de
+tableaux) ; un thread d'écriture la sérialise ensuite sur le disque.
+Chaque fichier est écrit dans un fichier temporaire du même dossier
+puis renommé avec os.replace : une interruption pendant l'écriture
+laisse l'ancien modèle intact.
+
+En mode journal (delta), le modèle est une base (la Q-table complète)
+suivie d'un journal binaire `<modèle>.log` où chaque sauvegarde ajoute
+seulement les (état, action, valeur) modifiés depuis la précédente. La
+Q-table note les cases modifiées par les mises à jour de l'agent
+(QTable.track_changes) : une sauvegarde ne coûte à l'entraînement que
+ces cases. Le thread d'écriture garde sa propre copie de la table, à
+laquelle il applique le journal ; quand le journal dépasse
+`compact_ratio` fois la taille de la base, il écrit cette copie comme
+nouvelle base et le journal repart de zéro. Le journal porte
+l'identifiant (generation) de sa base : un journal qui ne correspond
+pas à la base est ignoré au chargement.
+"""
+from contextlib import contextmanager
+import os
+import pickle
+import queue
+import struct
+import threading
+import time
+import numpy as np
+from src.encoding import state_key_bytes
+from src.q_table import QTable
+
+LOG_SUFFIX = ".log"
+_LOG_MAGIC = b"QLOG"
+_LOG_VERSION = 1
+# Magique, version, taille des clés, identifiant de la base
+_LOG_HEADER = struct.Struct("<4sBBq")
+# Tâche du thread d'écriture : fondre le journal dans une nouvelle base
+_COMPACT = object()
+# Création exclusive du fichier temporaire, avec les droits d'un open()
+# ordinaire (0666 moins le masque du processus)
+_TMP_FLAGS = (os.O_WRONLY | os.O_CREAT | os.O_EXCL |
+              getattr(os, "O_BINARY", 0))
+
+
+def snapshot_table(q_table):
+    """Copie d'une Q-table (ordinaire ou partagée) à sauvegarder."""
+    if isinstance(q_table, QTable):
+        return q_table.copy()
+    return q_table.snapshot()
+
+
+@contextmanager
+def atomic_open(path):
+    """
+    Ouvre un fichier temporaire à côté de `path` ; il remplace `path`
+    seulement si le bloc se termine sans erreur.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        tmp_path = f"{path}.{os.urandom(4).hex()}.tmp"
+        try:
+            fd = os.open(tmp_path, _TMP_FLAGS, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_atomic(path, q_table):
+    """
+    Sérialise une Q-table dans `path` sans jamais laisser de fichier
+    à moitié écrit.
+    """
+    with atomic_open(path) as f:
+        pickle.dump(q_table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def record_dtype(key_bytes):
+    """Type NumPy d'un enregistrement du journal."""
+    return np.dtype([("key", f"V{key_bytes}"), ("action", "u1"),
+                     ("value", "<f4")])
+
+
+def encode_records(q_table, state_ids, action_ids, key_bytes):
+    """
+    Enregistrements du journal pour des (état, action) d'une Q-table.
+    :raise OverflowError: si un état ne tient pas sur `key_bytes` octets.
+    """
+    keys = {}
+    for state_id in np.unique(state_ids).tolist():
+        keys[state_id] = q_table.states[state_id].to_bytes(key_bytes,
+                                                           "little")
+    records = np.empty(len(state_ids), dtype=record_dtype(key_bytes))
+    records["key"] = np.frombuffer(
+        b"".join(keys[state_id] for state_id in state_ids.tolist()),
+        dtype=f"V{key_bytes}")
+    records["action"] = action_ids
+    records["value"] = q_table.values[state_ids, action_ids]
+    return records.tobytes()
+
+
+def replay_log(path, q_table):
+    """
+    Applique à une Q-table les enregistrements d'un journal, dans
+    l'ordre (le dernier enregistrement d'un (état, action) l'emporte).
+    Un journal absent ou d'une autre base est ignoré, de même qu'un
+    enregistrement incomplet en fin de fichier (écriture interrompue).
+    :return: Nombre d'enregistrements appliqués.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_LOG_HEADER.size)
+            data = f.read()
+    except FileNotFoundError:
+        return 0
+    if len(header) < _LOG_HEADER.size:
+        return 0
+    magic, version, key_bytes, generation = _LOG_HEADER.unpack(header)
+    if (magic != _LOG_MAGIC or version != _LOG_VERSION or
+            generation != q_table.generation):
+        print(f"Journal {path} ignoré : il ne correspond pas au modèle.")
+        return 0
+    return apply_records(q_table, data, key_bytes)
+
+
+def apply_records(q_table, data, key_bytes):
+    """
+    Applique des enregistrements du journal à une Q-table (le dernier
+    enregistrement d'un (état, action) l'emporte).
+    :return: Nombre d'enregistrements appliqués.
+    """
+    dtype = record_dtype(key_bytes)
+    count = len(data) // dtype.itemsize
+    if count == 0:
+        return 0
+    records = np.frombuffer(data, dtype=dtype, count=count)
+
+    state_ids = np.array([q_table.intern(int.from_bytes(key, "little"))
+                          for key in records["key"].tolist()],
+                         dtype=np.int64)
+    action_ids = records["action"].astype(np.int64)
+    # Garder le dernier enregistrement de chaque (état, action)
+    cells = state_ids * len(q_table.actions) + action_ids
+    _, last = np.unique(cells[::-1], return_index=True)
+    last = count - 1 - last
+    q_table.values[state_ids[last], action_ids[last]] = \
+        records["value"][last]
+    return count
+
+
+class Checkpointer:
+    """
+    Sauvegardes périodiques d'un agent par un thread d'écriture.
+
+    Une sauvegarde est déclenchée toutes les `every_sessions` sessions
+    ou toutes les `every_seconds` secondes (le premier des deux), et
+    toujours à la fermeture. En mode complet, si le disque est plus lent
+    que l'entraînement, seule la copie la plus récente de chaque fichier
+    est écrite.
+    """
+
+    def __init__(self, agent, model_name, every_sessions=100,
+                 every_seconds=60.0, delta=False, compact_ratio=1.0,
+                 directory="save"):
+        """
+        :param agent: Agent dont la Q-table est sauvegardée.
+        :param model_name: Nom du fichier de sauvegarde.
+        :param every_sessions: Sessions entre deux sauvegardes
+        (0 : pas de limite).
+        :param every_seconds: Secondes entre deux sauvegardes
+        (0 : pas de limite).
+        :param delta: Sauvegarde le modèle sous forme de base + journal
+        des modifications.
+        :param compact_ratio: Taille du journal (en Q-values) au-delà de
+        laquelle il est fondu dans une nouvelle base, relativement à la
+        taille de la base.
+        :param directory: Dossier des sauvegardes.
+        """
+        self.agent = agent
+        self.model_name = model_name
+        self.every_sessions = every_sessions
+        self.every_seconds = every_seconds
+        self.delta = delta
+        self.compact_ratio = compact_ratio
+        self.directory = directory
+        self.last_session = 0
+        self.last_time = time.monotonic()
+        self.error = None
+        # Mode journal : table suivie (voir QTable.track_changes),
+        # nombre d'états à la dernière sauvegarde, taille du journal et
+        # de la base en Q-values
+        self.tracked = None
+        self.known = 0
+        self.log_records = 0
+        self.base_cells = 0
+        # Copie de la table gardée par le thread d'écriture : dernière
+        # base et journal appliqué
+        self.base = None
+        self.key_bytes = state_key_bytes()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.ready = queue.Queue()
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def _writer(self):
+        """
+        Boucle du thread d'écriture. Les tâches sont un nom de fichier à
+        écrire en entier, des enregistrements à ajouter au journal
+        (bytes), une nouvelle base (QTable) ou _COMPACT.
+        """
+        while True:
+            task = self.ready.get()
+            if task is None:
+                break
+            try:
+                if task is _COMPACT:
+                    # La copie contient la base et tout le journal
+                    self.base.generation = time.time_ns()
+                    self._write_base(self.base)
+                elif isinstance(task, str):
+                    with self.lock:
+                        q_table = self.pending.pop(task, None)
+                    if q_table is not None:  # Sinon déjà écrit
+                        write_atomic(os.path.join(self.directory, task),
+                                     q_table)
+                elif isinstance(task, bytes):
+                    self._append_log(task)
+                    apply_records(self.base, task, self.key_bytes)
+                else:
+                    self._write_base(task)
+            except Exception as e:
+                self.error = e
+                print(f"Erreur lors de la sauvegarde : {e}")
+
+    def _write_base(self, q_table):
+        """
+        Écrit une nouvelle base puis un journal vide qui la suit ; la
+        base devient la copie du thread d'écriture.
+        """
+        self.base = q_table
+        path = os.path.join(self.directory, self.model_name)
+        write_atomic(path, q_table)
+        with atomic_open(path + LOG_SUFFIX) as f:
+            f.write(_LOG_HEADER.pack(_LOG_MAGIC, _LOG_VERSION,
+                                     self.key_bytes, q_table.generation))
+
+    def _append_log(self, data):
+        """Ajoute des enregistrements à la fin du journal."""
+        path = os.path.join(self.directory, self.model_name + LOG_SUFFIX)
+        with open(path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save(self, filename=None):
+        """
+        Copie la Q-table actuelle (ou ses modifications en mode journal)
+        et la confie au thread d'écriture.
+        :param filename: Nom du fichier (défaut : model_name).
+        """
+        filename = filename or self.model_name
+        q_table = self.agent.q_table
+        if (self.delta and filename == self.model_name and
+                isinstance(q_table, QTable)):
+            self._save_delta(q_table)
+            return
+        q_table = snapshot_table(q_table)
+        with self.lock:
+            queued = filename in self.pending
+            self.pending[filename] = q_table
+        if not queued:
+            self.ready.put(filename)
+
+    def _save_delta(self, q_table):
+        """
+        Envoie au journal les Q-values modifiées depuis la dernière
+        sauvegarde, puis demande au thread d'écriture de fondre le
+        journal dans une nouvelle base s'il est trop long.
+        """
+        if self.tracked is not q_table:
+            # Première sauvegarde ou table remplacée
+            self._new_base(q_table)
+            return
+        count = q_table.num_states
+        num_actions = len(q_table.actions)
+        cells = q_table.take_changes()
+        # États connus : cases modifiées ; nouveaux : toutes leurs actions
+        state_ids, action_ids = np.divmod(
+            cells[cells < self.known * num_actions], num_actions)
+        state_ids = np.concatenate(
+            [state_ids, np.repeat(np.arange(self.known, count), num_actions)])
+        action_ids = np.concatenate(
+            [action_ids, np.tile(np.arange(num_actions), count - self.known)])
+        try:
+            data = encode_records(q_table, state_ids, action_ids,
+                                  self.key_bytes)
+        except OverflowError:
+            # État trop grand pour le journal : nouvelle base
+            self._new_base(q_table)
+            return
+        if data:
+            self.ready.put(data)
+        self.known = count
+        self.log_records += len(state_ids)
+        if self.log_records > self.compact_ratio * self.base_cells:
+            self.ready.put(_COMPACT)
+            self.log_records = 0
+            self.base_cells = count * num_actions
+
+    def _new_base(self, q_table):
+        """
+        Envoie une copie complète de la table comme nouvelle base et
+        commence à suivre ses modifications.
+        """
+        base = q_table.copy()
+        base.generation = time.time_ns()
+        self.ready.put(base)
+        q_table.track_changes()
+        self.tracked = q_table
+        self.known = q_table.num_states
+        self.log_records = 0
+        self.base_cells = self.known * len(q_table.actions)
+
+    def maybe_save(self, session):
+        """
+        Sauvegarde si la cadence est atteinte.
+        :param session: Nombre de sessions jouées jusqu'ici.
+        :return: True si une sauvegarde a été lancée.
+        """
+        now = time.monotonic()
+        due = ((self.every_sessions and
+                session - self.last_session >= self.every_sessions) or
+               (self.every_seconds and
+                now - self.last_time >= self.every_seconds))
+        if not due:
+            return False
+        self.last_session = session
+        self.last_time = now
+        self.save()
+        return True
+
+    def close(self):
+        """
+        Lance la sauvegarde finale et attend la fin de toutes les
+        écritures.
+        """
+        self.save()
+        self.ready.put(None)
+        self.thread.join()
+        if self.error is None:
+            print(f"Modèle sauvegardé dans {self.model_name}, "
+                  f"nombre d'états : {self.agent.q_table.num_states}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
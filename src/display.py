@@ -1,8 +1,28 @@
+import time
 import pygame
+from src.cache import LRUCache
+
+WHITE = (255, 255, 255)
+
+# Couleur des cases ; blanc pour les cases vides
+CELL_COLORS = {
+    "S": (0, 0, 255),  # Bleu pour le serpent
+    "G": (0, 255, 0),  # Vert pour les pommes vertes
+    "R": (255, 0, 0),  # Rouge pour les pommes rouges
+}
 
 
 class Display:
-    def __init__(self, board_size=10, cell_size=50):
+    def __init__(self, board_size=10, cell_size=50, text_cache_size=256,
+                 end_screen_seconds=5.0):
+        """
+        :param board_size: Taille du plateau (en cases).
+        :param cell_size: Taille d'une case en pixels.
+        :param text_cache_size: Nombre maximal de textes rendus gardés
+        en cache.
+        :param end_screen_seconds: Durée d'affichage de l'écran de fin
+        (une touche le ferme plus tôt).
+        """
         self.board_size = board_size
         self.cell_size = cell_size
         self.margin = 200  # Espace pour le score
@@ -10,13 +30,46 @@ class Display:
                                                self.margin, board_size *
                                                cell_size))
         pygame.display.set_caption("Snake RL")
-        self.font = pygame.font.SysFont(None, 30)  # Police pour le score
+        # Polices par taille (peu nombreuses) et textes déjà rendus,
+        # indexés par (texte, taille, couleur)
+        self.fonts = {}
+        self.texts = LRUCache(text_cache_size)
+        # Fonds pré-rendus (terrain vide et libellés fixes), par libellés
+        self.backgrounds = {}
+        self.font = self.get_font(30)  # Police pour le score
+        # Écran de fin affiché par-dessus le jeu jusqu'à cet instant
+        # (time.monotonic), la partie suivante continuant en dessous
+        self.end_screen_seconds = end_screen_seconds
+        self.end_screen_until = None
+        # Image précédente, pour ne redessiner que ce qui change
+        self.invalidate()
+
+    def get_font(self, size):
+        """Police par défaut de la taille demandée, créée une seule fois."""
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.SysFont(None, size)
+        return font
+
+    def render_text(self, text, size=30, color=WHITE):
+        """
+        Rendu d'un texte, réutilisé tant qu'il reste dans le cache.
+        :return: Surface du texte.
+        """
+        key = (text, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = self.get_font(size).render(text, True, color)
+            self.texts.put(key, surface)
+        return surface
 
     def draw_board(self, board, score, elapsed_time, snake_length,
                    current_session=None, total_sessions=None,
                    means_score=None, means_length=None):
         """
         Dessine le plateau de jeu et affiche le score.
+        Seules les cases et les lignes d'informations qui ont changé
+        depuis l'image précédente sont redessinées et envoyées à l'écran.
         :param board: État du plateau.
         :param score: Score actuel.
         :param elapsed_time: Temps écoulé en secondes.
@@ -24,95 +77,155 @@ class Display:
         :param current_session: Numéro de la session actuelle (optionnel).
         :param total_sessions: Nombre total de sessions (optionnel).
         """
-        self.screen.fill((0, 0, 0))  # Fond noir
+        if self.end_screen_until is not None and \
+                not self.end_screen_done():
+            return  # L'écran de fin reste affiché
+        lines = self.info_lines(score, elapsed_time, snake_length,
+                                current_session, total_sessions,
+                                means_score, means_length)
+        labels = tuple(label for label, _, _ in lines)
+        if self.previous_board is None or labels != self.labels:
+            self.draw_full(board, lines, labels)
+            return
+
+        dirty = []
+        # Dessin des cases modifiées
+        for x, (row, previous_row) in enumerate(zip(board,
+                                                    self.previous_board)):
+            if row == previous_row:
+                continue
+            for y, (cell, previous) in enumerate(zip(row, previous_row)):
+                if cell != previous:
+                    dirty.append(self.draw_cell(x, y, cell))
+        self.previous_board = list(board)
 
-        # Dessin de la grille
-        for x in range(len(board)):
-            for y in range(len(board[x])):
-                color = (255, 255, 255)  # Blanc pour les cases vides
-                if board[x][y] == "S":
-                    color = (0, 0, 255)  # Bleu pour le serpent
-                elif board[x][y] == "G":
-                    color = (0, 255, 0)  # Vert pour les pommes vertes
-                elif board[x][y] == "R":
-                    color = (255, 0, 0)  # Rouge pour les pommes rouges
-
-                pygame.draw.rect(
-                    self.screen,
-                    color,
-                    pygame.Rect(y * self.cell_size, x *
-                                self.cell_size, self.cell_size,
-                                self.cell_size)
-                )
-
-        # Affichage des informations supplémentaires
-        self.draw_info(score, elapsed_time, snake_length,
-                       current_session, total_sessions,
-                       means_score, means_length)
+        # Lignes d'informations modifiées
+        for i, (line, previous) in enumerate(zip(lines,
+                                                 self.previous_lines)):
+            if line != previous:
+                dirty.append(self.draw_line(i, line))
+        self.previous_lines = lines
 
+        if dirty:
+            pygame.display.update(dirty)
+
+    def draw_full(self, board, lines, labels):
+        """Redessine toute la fenêtre à partir du fond pré-rendu."""
+        self.background = self.get_background(labels)
+        self.labels = labels
+        self.screen.blit(self.background, (0, 0))
+        for x, row in enumerate(board):
+            for y, cell in enumerate(row):
+                if cell in CELL_COLORS:
+                    self.draw_cell(x, y, cell)
+        self.line_rects = {}
+        for i, line in enumerate(lines):
+            self.draw_line(i, line)
+        self.previous_board = list(board)
+        self.previous_lines = lines
         pygame.display.flip()
 
-    def draw_info(self, score, elapsed_time, snake_length,
-                  current_session=None, total_sessions=None,
-                  means_score=None, means_length=None):
+    def get_background(self, labels):
         """
-        Affiche les informations supplémentaires à côté du terrain.
-        :param score: Score actuel.
-        :param elapsed_time: Temps écoulé en secondes.
-        :param snake_length: Longueur actuelle du serpent.
-        :param current_session: Numéro de la session actuelle (optionnel).
-        :param total_sessions: Nombre total de sessions (optionnel).
+        Fond de la fenêtre : terrain vide et libellés fixes des lignes
+        d'informations, rendu une fois par ensemble de libellés.
         """
-        max_text_width = self.margin - 40
-        # Affiche le score
-        score_text = self.font.render(f"Score: "
-                                      f"{score}", True, (255, 255, 255))
-        self.screen.blit(score_text,
-                         (self.board_size * self.cell_size + 20, 20))
+        background = self.backgrounds.get(labels)
+        if background is None:
+            background = pygame.Surface(self.screen.get_size())
+            background.fill((0, 0, 0))  # Fond noir
+            side = self.board_size * self.cell_size
+            background.fill(WHITE, (0, 0, side, side))
+            for i, label in enumerate(labels):
+                if label:
+                    background.blit(self.render_text(label),
+                                    self.line_position(i))
+            self.backgrounds[labels] = background
+        return background
 
-        # Affiche le temps écoulé
-        time_text = self.font.render(f"Time: {elapsed_time:.1f}s",
-                                     True, (255, 255, 255))
-        self.screen.blit(time_text,
-                         (self.board_size * self.cell_size + 20, 60))
+    def invalidate(self):
+        """
+        Oublie l'image précédente : la prochaine image est redessinée
+        en entier (après un écran de fin ou un effacement de la fenêtre).
+        """
+        self.previous_board = None
+        self.previous_lines = []
+        self.line_rects = {}
+        self.labels = None
 
-        # Affiche la longueur du serpent
-        length_text = self.font.render(f"Length: "
-                                       f"{snake_length}",
-                                       True, (255, 255, 255))
-        self.screen.blit(length_text,
-                         (self.board_size * self.cell_size + 20, 100))
+    def draw_cell(self, x, y, cell):
+        """
+        Dessine une case du plateau ; une case vide est recopiée depuis
+        le fond.
+        :return: Rectangle modifié.
+        """
+        rect = pygame.Rect(y * self.cell_size, x * self.cell_size,
+                           self.cell_size, self.cell_size)
+        color = CELL_COLORS.get(cell)
+        if color is None:
+            self.screen.blit(self.background, rect, rect)
+        else:
+            pygame.draw.rect(self.screen, color, rect)
+        return rect
 
+    def info_lines(self, score, elapsed_time, snake_length,
+                   current_session=None, total_sessions=None,
+                   means_score=None, means_length=None):
+        """
+        Lignes d'informations affichées à côté du terrain.
+        :return: Liste de tuples (libellé, valeur, réduit). Le libellé
+        fait partie du fond ; une ligne `réduite` n'a pas de libellé et
+        sa police est réduite pour tenir dans la marge.
+        """
+        lines = [
+            ("Score: ", f"{score}", False),
+            ("Time: ", f"{elapsed_time:.1f}s", False),
+            ("Length: ", f"{snake_length}", False),
+        ]
         # Affiche la session actuelle si en mode entraînement
         if current_session is not None and total_sessions is not None:
-            session_text = self.font.render(f"Session: "
-                                            f"{current_session}/"
-                                            f"{total_sessions}",
-                                            True, (255, 255, 255))
-            self.screen.blit(session_text,
-                             (self.board_size * self.cell_size + 20, 140))
-
+            lines.append(("Session: ", f"{current_session}/{total_sessions}",
+                          False))
         if means_score is not None and means_length is not None:
-            means_score_text = self.render_text_clipped(f"Mean Score: "
-                                                        f"{means_score}",
-                                                        max_text_width)
-            self.screen.blit(means_score_text,
-                             (self.board_size * self.cell_size + 20, 180))
-            means_length_text = self.render_text_clipped(f"Mean Length: "
-                                                         f"{means_length}",
-                                                         max_text_width)
-            self.screen.blit(means_length_text,
-                             (self.board_size * self.cell_size + 20, 220))
+            lines.append((None, f"Mean Score: {means_score}", True))
+            lines.append((None, f"Mean Length: {means_length}", True))
+        return lines
+
+    def line_position(self, index):
+        """Position du début d'une ligne d'informations."""
+        return (self.board_size * self.cell_size + 20, 20 + 40 * index)
+
+    def draw_line(self, index, line):
+        """
+        Efface puis dessine la valeur d'une ligne d'informations.
+        :param index: Numéro de la ligne (position verticale).
+        :param line: Tuple (libellé, valeur, réduit).
+        :return: Rectangle modifié.
+        """
+        previous = self.line_rects.pop(index, None)
+        if previous is not None:
+            self.screen.blit(self.background, previous, previous)
+        label, value, clipped = line
+        x, y = self.line_position(index)
+        if clipped:
+            surface = self.render_text_clipped(value, self.margin - 40)
+        else:
+            surface = self.render_text(value)
+        if label:
+            x += self.render_text(label).get_width()
+        rect = self.screen.blit(surface, (x, y))
+        self.line_rects[index] = rect
+        return rect.union(previous) if previous is not None else rect
 
     def render_text_clipped(self, text, max_width):
         font_size = 36
-        font = pygame.font.SysFont(None, font_size)
+        font = self.get_font(font_size)
         while font.size(text)[0] > max_width:  # Réduire taille de la police
             font_size -= 2
             if font_size < 10:  # Taille minimale pour éviter l'invisibilité
                 break
-            font = pygame.font.SysFont(None, font_size)
-        return font.render(text, True, (255, 255, 255))
+            font = self.get_font(font_size)
+        return self.render_text(text, font_size)
 
     def show_end_screen(self, title, score, elapsed_time,
                         snake_length, reason):
@@ -124,12 +237,12 @@ class Display:
         :param snake_length: Longueur finale du serpent.
         :param reason: Raison de la fin de partie.
         """
+        self.invalidate()
         self.screen.fill((0, 0, 0))  # Fond noir
 
         # Police plus grande pour le titre
-        title_font = pygame.font.SysFont(None, 72)  # Police plus grande
         title_color = (0, 255, 0) if title == "Victory" else (255, 0, 0)
-        title_text = title_font.render(title, True, title_color)
+        title_text = self.render_text(title, 72, title_color)
 
         # Calcul pour centrer le titre
         title_rect = title_text.get_rect(center=(self.board_size *
@@ -137,31 +250,55 @@ class Display:
         self.screen.blit(title_text, title_rect)
 
         # Raison de la fin
-        reason_text = self.font.render(f"Reason: {reason}",
-                                       True, (255, 255, 255))
+        reason_text = self.render_text(f"Reason: {reason}")
         self.screen.blit(reason_text,
                          (self.board_size * self.cell_size // 2 - 100, 200))
 
         # Score final
-        score_text = self.font.render(f"Score: {score}",
-                                      True, (255, 255, 255))
+        score_text = self.render_text(f"Score: {score}")
         self.screen.blit(score_text,
                          (self.board_size * self.cell_size // 2 - 100, 250))
 
         # Temps écoulé
-        time_text = self.font.render(f"Time: {elapsed_time:.1f}s",
-                                     True, (255, 255, 255))
+        time_text = self.render_text(f"Time: {elapsed_time:.1f}s")
         self.screen.blit(time_text,
                          (self.board_size * self.cell_size // 2 - 100, 300))
 
         # Longueur finale
-        length_text = self.font.render(f"Length: {snake_length}",
-                                       True, (255, 255, 255))
+        length_text = self.render_text(f"Length: {snake_length}")
         self.screen.blit(length_text,
                          (self.board_size * self.cell_size // 2 - 100, 350))
 
         # Met à jour l'affichage
         pygame.display.flip()
 
-        # Pause pour permettre au joueur de lire les informations
-        pygame.time.wait(5000)
+        # L'écran reste affiché sans bloquer la partie suivante
+        pygame.event.clear(pygame.KEYDOWN)
+        self.end_screen_until = time.monotonic() + self.end_screen_seconds
+
+    def end_screen_done(self):
+        """
+        Indique si l'écran de fin a fini de s'afficher (durée écoulée ou
+        touche pressée) ; la prochaine image est alors redessinée en
+        entier.
+        """
+        if self.end_screen_until is None:
+            return True
+        if (time.monotonic() < self.end_screen_until and
+                not pygame.event.get(pygame.KEYDOWN)):
+            return False
+        self.end_screen_until = None
+        self.invalidate()
+        return True
+
+    def wait_end_screen(self):
+        """
+        Attend la fin de l'écran de fin, avant de fermer la fenêtre à la
+        fin du programme.
+        """
+        clock = pygame.time.Clock()
+        while not self.end_screen_done():
+            if pygame.event.peek(pygame.QUIT):
+                self.end_screen_until = None
+                break
+            clock.tick(30)
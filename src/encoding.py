@@ -0,0 +1,127 @@
+"""
+Encodage compact de l'état de l'agent.
+
+La vision tronquée des quatre rayons (haut, bas, gauche, droite) est
+rangée dans un seul entier : pour chaque rayon, les codes des cases
+sur CELL_BITS bits chacun, suivis de la longueur du rayon sur
+LENGTH_BITS bits. Un rayon s'arrête après la première case "S", "G"
+ou "W", comme dans QLearningAgent.get_global_state.
+"""
+from src.board import CELL_CHARS, SNAKE, GREEN, WALL, VISION_TABLE
+
+DIRECTIONS = ("up", "down", "left", "right")
+CELL_BITS = 3
+LENGTH_BITS = 6
+CELL_MASK = (1 << CELL_BITS) - 1
+MAX_RAY_LENGTH = (1 << LENGTH_BITS) - 1
+
+# Caractère de vision -> code de case
+CELL_CODES = {char: code for code, char in enumerate(CELL_CHARS)}
+_CODE_TABLE = bytes.maketrans(CELL_CHARS.encode(), bytes(range(5)))
+STOP_CODES = (SNAKE, GREEN, WALL)
+
+
+def encode_rays(rays):
+    """
+    Encode quatre rayons de codes de cases en un entier.
+    :param rays: Quatre séquences de codes (haut, bas, gauche, droite).
+    :return: Entier représentant l'état.
+    """
+    state = 0
+    for ray in rays:
+        length = 0
+        for code in ray:
+            state = (state << CELL_BITS) | code
+            length += 1
+            if code in STOP_CODES:
+                break
+        if length > MAX_RAY_LENGTH:
+            raise ValueError(f"Rayon trop long pour l'encodage : {length}")
+        state = (state << LENGTH_BITS) | length
+    return state
+
+
+def encode_vision(vision):
+    """
+    Encode une vision (dictionnaire de listes de caractères) en un entier.
+    :param vision: Dictionnaire des visions par direction.
+    :return: Entier représentant l'état.
+    """
+    return encode_rays([CELL_CODES[cell] for cell in vision.get(direction,
+                                                                 ())]
+                       for direction in DIRECTIONS)
+
+
+def vision_key(vision):
+    """
+    Clé compacte d'une vision brute complète (non tronquée) : les codes
+    des cases des quatre rayons mis bout à bout. Chaque rayon se termine
+    par un mur, la clé est donc sans ambiguïté.
+    """
+    return "".join(["".join(vision[direction])
+                    for direction in DIRECTIONS]).encode().translate(
+                        _CODE_TABLE)
+
+
+def rays_key(rays):
+    """
+    Même clé que vision_key, calculée directement sur des rayons de
+    codes (voir Board.get_rays).
+    """
+    return b"".join(rays)
+
+
+def rays_to_vision(rays):
+    """
+    Convertit quatre rayons de codes en dictionnaire de vision.
+    """
+    return {direction: list(ray.translate(VISION_TABLE).decode("ascii"))
+            for direction, ray in zip(DIRECTIONS, rays)}
+
+
+def decode_state(state):
+    """
+    Décode un état entier (utile pour le débogage).
+    :param state: Entier produit par encode_rays ou encode_vision.
+    :return: Tuple ((direction, cases), ...) au format de get_global_state.
+    """
+    rays = []
+    for direction in reversed(DIRECTIONS):
+        length = state & MAX_RAY_LENGTH
+        state >>= LENGTH_BITS
+        cells = []
+        for _ in range(length):
+            cells.append(CELL_CHARS[state & CELL_MASK])
+            state >>= CELL_BITS
+        rays.append((direction, tuple(reversed(cells))))
+    return tuple(reversed(rays))
+
+
+def state_key_bytes(max_ray_length=12):
+    """
+    Nombre d'octets nécessaires pour stocker un état encodé dont aucun
+    rayon ne dépasse `max_ray_length` cases (la vision redimensionnée
+    en compte au plus 11, celle d'un plateau 10x10 au plus 10).
+    """
+    bits = 4 * (max_ray_length * CELL_BITS + LENGTH_BITS)
+    return (bits + 7) // 8
+
+
+def is_legacy_q_table(q_table):
+    """
+    Indique si une Q-table utilise l'ancien format de clés
+    (tuples de chaînes produits par get_global_state).
+    """
+    for state, _ in q_table:
+        return isinstance(state, tuple)
+    return False
+
+
+def convert_q_table(q_table):
+    """
+    Convertit une Q-table de l'ancien format vers des états entiers.
+    :param q_table: Dictionnaire {(état tuple, action): valeur}.
+    :return: Dictionnaire {(état entier, action): valeur}.
+    """
+    return {(encode_vision(dict(state)), action): value
+            for (state, action), value in q_table.items()}
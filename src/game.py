@@ -1,35 +1,48 @@
-import pygame
+import random
+import time
 from src.board import Board
-from src.display import Display
+from src.profiling import NULL_TIMER
+from src.render import RenderPolicy
+from src.trace import ACTION_INDEX, EpisodeTrace
 
 
 class Game:
     def __init__(self, board_size=10, display=True,
-                 speed=1, victory_condition=10, mode="player"):
+                 speed=1, victory_condition=10, mode="player",
+                 rewards=None, seed=None, text_cache_size=256,
+                 render_policy=None, end_screen_seconds=5.0):
         self.board_size = board_size
         self.display_enabled = display
         self.speed = speed
         self.victory_condition = victory_condition
         self.mode = mode
+        self.rewards = rewards
+        # Générateur propre au jeu, partagé par les plateaux successifs
+        # (voir src.seeding pour dériver la graine)
+        self.rng = random.Random(seed)
+        # Mesure du temps par phase (voir src.profiling)
+        self.timer = NULL_TIMER
+        # Rafraîchissement de l'affichage avec un agent (voir src.render)
+        self.render_policy = render_policy or RenderPolicy()
+        # Enregistrement des parties (TraceWriter, voir src.trace)
+        self.trace_writer = None
 
         # Génération du plateau et récupération du serpent et
         # de la direction initiale
-        self.board = Board(size=board_size,
-                           victory_condition=victory_condition)
-        self.board.snake, self.direction = self.board.generate_snake()
+        self.board = self.new_board()
+        self.direction = self.board.direction
         self.score = 0
 
         if self.display_enabled:
+            # Import tardif : le mode sans affichage ne charge ni pygame
+            # ni SDL
+            import pygame
+            from src.display import Display
+
             pygame.init()
-            self.display = Display(board_size=board_size)
-            self.cell_size = 50
-            self.margin = 200  # Espace pour le score
-            window_width = board_size * self.cell_size + self.margin
-            window_height = board_size * self.cell_size
-            self.screen = pygame.display.set_mode((window_width,
-                                                   window_height))
-            pygame.display.set_caption("Snake RL")
-            self.font = pygame.font.SysFont(None, 36)  # Police pour le score
+            self.display = Display(board_size=board_size,
+                                   text_cache_size=text_cache_size,
+                                   end_screen_seconds=end_screen_seconds)
         else:
             self.display = None
 
@@ -40,6 +53,8 @@ class Game:
         if self.mode == "model":
             return  # Pas de gestion des événements clavier en mode modèle
 
+        import pygame
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
@@ -69,15 +84,16 @@ class Game:
 
     def draw_score(self):
         """Affiche le score à côté du terrain."""
-        score_text = self.font.render(f"Score: {self.score}",
-                                      True, (255, 255, 255))
-        score_position = (self.board_size * self.cell_size + 20, 20)
-        self.screen.blit(score_text, score_position)
+        score_text = self.display.render_text(f"Score: {self.score}")
+        self.display.screen.blit(score_text,
+                                 self.display.line_position(0))
 
     def wait_for_space(self, agent):
         """
         Pause le jeu jusqu'à ce que l'utilisateur appuie sur la barre espace.
         """
+        import pygame
+
         paused = True
         while paused:
             for event in pygame.event.get():
@@ -105,11 +121,43 @@ class Game:
         (utilisé en mode train).
         :param total_sessions: Nombre total de sessions
         (utilisé en mode train).
+        :return: Tuple (longueur finale du serpent, score).
         """
-        clock = pygame.time.Clock()
-        start_time = pygame.time.get_ticks()
+        if self.display_enabled:
+            import pygame
+
+            clock = pygame.time.Clock()
+        else:
+            step = False  # Le pas à pas nécessite une fenêtre
+        start_time = time.monotonic()
+        timer = self.timer
+        # Le mode joueur et le pas à pas sont toujours affichés en
+        # temps réel
+        policy = self.render_policy
+        realtime = agent is None or step or policy.realtime
+
+        # Enregistrement de la partie, si demandé
+        trace = None
+        if self.trace_writer is not None:
+            trace = EpisodeTrace.start(self.board, self.board_seed,
+                                       current_session or 0)
+
+        if agent:
+            # Observation initiale dans l'encodage de l'agent
+            state = self.board.observe(agent.get_state_from_rays)
+            blocked = self.board.blocked_directions()
 
         while self.running:
+            # Écran de fin de la partie précédente : il lit les touches
+            # avant handle_events et wait_for_space, qui les videraient
+            end_screen = (self.display_enabled and
+                          not self.display.end_screen_done())
+            if end_screen and (agent is None or step):
+                # Un joueur ne joue pas à l'aveugle : la partie attend
+                self.display.wait_end_screen()
+                start_time = time.monotonic()
+                end_screen = False
+
             # Si en mode joueur, gérer les événements clavier
             if self.display_enabled and agent is None:
                 self.handle_events()
@@ -117,30 +165,28 @@ class Game:
             if step:
                 self.wait_for_space(agent)
 
-            elapsed_time = (pygame.time.get_ticks() - start_time) / 1000
+            elapsed_time = time.monotonic() - start_time
 
-            # Déterminer l'action
+            # Déterminer l'action, jouer le pas et apprendre
             if agent:
-                # direction = self.board.direction
-                vision = self.board.get_vision()  # Obtenir la vision actuelle
-                action = agent.choose_action(
-                    vision=vision,
-                    # current_direction=direction
-                )
-                self.board.update_direction(action)
-
+                start = timer.start()
+                action = agent.select_action(state, blocked)
+                timer.stop("action", start)
+                next_state, reward, done, info = self.board.step(
+                    action, agent.get_state_from_rays, timer)
+                if train:
+                    start = timer.start()
+                    agent.update_q(state, action, reward, next_state, done)
+                    timer.stop("update", start)
+                state, blocked = next_state, info["blocked"]
+                result = info["result"]
             else:
                 action = self.board.direction
-
-            # Effectuer l'action et obtenir le résultat
-            result = self.board.move_snake(action)
-
-            # Récompenser ou punir en mode train
-            if agent:
-                reward = self.board.calculate_reward(result)
-                if train:
-                    next_vision = self.board.get_vision()
-                    agent.update_q_value(vision, action, reward, next_vision)
+                # Effectuer l'action et obtenir le résultat
+                result = self.board.move_snake(action)
+            if trace is not None:
+                # move_snake retient la direction jouée
+                trace.actions.append(ACTION_INDEX[self.board.direction])
 
             if result == "green":
                 self.score += 1  # Incrémente le score pour une pomme verte
@@ -153,11 +199,8 @@ class Game:
                     reason="Collision",
                     elapsed_time=elapsed_time
                 )
-                if train:
-                    length = len(self.board.snake.get_body())
-                    score = self.score
-                    return length, score
-                break
+                self.end_trace(trace)
+                return len(self.board.snake.get_body()), self.score
 
             # Vérifier la victoire
             if self.board.is_victory():
@@ -168,29 +211,35 @@ class Game:
                     reason="Length achieved",
                     elapsed_time=elapsed_time
                 )
-                if train:
-                    length = len(self.board.snake.get_body())
-                    score = self.score
-                    return length, score
-                break
+                self.end_trace(trace)
+                return len(self.board.snake.get_body()), self.score
 
             # self.print_action(action)
             # self.board.get_vision()
 
-            # Affichage
-            if self.display_enabled:
-                self.display.draw_board(
-                    self.board.get_state(),
-                    score=self.score,
-                    elapsed_time=elapsed_time,
-                    snake_length=len(self.board.snake.get_body()),
-                    current_session=current_session,
-                    total_sessions=total_sessions,
-                    means_score=means_score,
-                    means_length=means_length
-                )
-            if self.display_enabled:
+            # Affichage : chaque pas en temps réel, sinon selon la
+            # politique de rafraîchissement, sans ralentir la simulation
+            if not self.display_enabled or not (realtime or
+                                                policy.should_render()):
+                continue
+            render_start = timer.start()
+            self.display.draw_board(
+                self.board.get_state(),
+                score=self.score,
+                elapsed_time=elapsed_time,
+                snake_length=len(self.board.snake.get_body()),
+                current_session=current_session,
+                total_sessions=total_sessions,
+                means_score=means_score,
+                means_length=means_length
+            )
+            render_start = timer.stop("render", render_start)
+            # La partie de l'agent continue sans attendre sous l'écran
+            # de fin
+            if realtime and not end_screen:
                 clock.tick(self.speed)
+                timer.stop("wait", render_start)
+        return len(self.board.snake.get_body()), self.score
 
     @staticmethod
     def print_action(action):
@@ -227,13 +276,36 @@ class Game:
             print(f"Time elapsed: {elapsed_time:.1f}s")
             print(f"Snake length: {len(self.board.snake.get_body())}")
 
+    def end_trace(self, trace):
+        """Ajoute la partie terminée à l'archive de parties."""
+        if trace is None:
+            return
+        trace.length = len(self.board.snake.get_body())
+        trace.score = self.score
+        self.trace_writer.write(trace)
+
+    def new_board(self):
+        """
+        Nouveau plateau avec son propre générateur, dont la graine est
+        tirée du générateur du jeu : la graine suffit à recréer le
+        serpent initial et les pommes lors d'une relecture.
+        """
+        self.board_seed = self.rng.getrandbits(64)
+        return Board(size=self.board_size,
+                     victory_condition=self.victory_condition,
+                     rewards=self.rewards, rng=random.Random(self.board_seed))
+
+    def wait_end_screen(self):
+        """Laisse l'écran de fin affiché avant de quitter le programme."""
+        if self.display_enabled and self.display:
+            self.display.wait_end_screen()
+
     def reset(self):
         """
         Réinitialise l'état du jeu pour une nouvelle session d'entraînement.
         """
         # Réinitialiser le plateau en utilisant Board
-        self.board = Board(size=self.board_size,
-                           victory_condition=self.victory_condition)
+        self.board = self.new_board()
 
         # Récupérer le serpent et la direction initiale depuis le Board
         self.board.snake = self.board.snake
@@ -242,10 +314,10 @@ class Game:
         # Réinitialiser le score
         self.score = 0
 
-        # Si l'affichage est activé, remettre l'écran à zéro
+        # Si l'affichage est activé, la prochaine image est redessinée
+        # en entier (l'écran de fin éventuel reste affiché)
         if self.display_enabled and self.display:
-            self.display.screen.fill((0, 0, 0))
-            pygame.display.flip()
+            self.display.invalidate()
 
         # Réactiver l'état de jeu
         self.running = True
@@ -0,0 +1,139 @@
+"""
+Format binaire en lecture seule d'une Q-table, chargé par mmap.
+
+Le fichier contient un en-tête, les actions, les clés des états triées
+(entiers big-endian de largeur fixe, l'ordre des octets est donc celui
+des entiers) puis les Q-values float32 [états + 1, actions]. La
+dernière ligne, à zéro, sert aux états inconnus.
+
+Le chargement ne lit rien : les pages sont lues à la demande et
+partagées par tous les processus qui ouvrent le même fichier.
+"""
+import struct
+import numpy as np
+from src.checkpoint import atomic_open
+from src.q_table import QTable
+
+MAGIC = b"QMAP"
+_VERSION = 1
+# Magique, version, taille des clés, nombre d'actions, nombre d'états
+_HEADER = struct.Struct("<4sBBHq")
+
+
+def _align(offset, size=8):
+    return offset + (-offset % size)
+
+
+def is_mapped_file(path):
+    """Indique si `path` est une Q-table exportée au format binaire."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def export_q_table(q_table, path):
+    """
+    Écrit une QTable au format binaire.
+    :param q_table: QTable à exporter.
+    :param path: Fichier de destination.
+    """
+    count = q_table.num_states
+    num_actions = len(q_table.actions)
+    key_bytes = max(1, (max((state.bit_length() for state in q_table.states),
+                            default=0) + 7) // 8)
+    keys = np.array([state.to_bytes(key_bytes, "big")
+                     for state in q_table.states], dtype=f"S{key_bytes}")
+    order = np.argsort(keys, kind="stable")
+    values = np.zeros((count + 1, num_actions), dtype="<f4")
+    values[:count] = q_table.values[:count][order]
+    actions = np.array(q_table.actions, dtype=np.int8)
+
+    with atomic_open(path) as f:
+        f.write(_HEADER.pack(MAGIC, _VERSION, key_bytes, num_actions, count))
+        f.write(actions.tobytes())
+        offset = _HEADER.size + actions.nbytes
+        f.write(bytes(_align(offset) - offset))
+        f.write(keys[order].tobytes())
+        offset = _align(offset) + keys.nbytes
+        f.write(bytes(_align(offset) - offset))
+        f.write(values.tobytes())
+
+
+class MappedQTable:
+    """
+    Q-table en lecture seule sur un fichier exporté par export_q_table.
+    Même interface de lecture que QTable (intern, get_id, values) :
+    un état inconnu renvoie la ligne à zéro au lieu d'être créé.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Fichier au format binaire.
+        """
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, key_bytes, num_actions, count = _HEADER.unpack(
+            self.data[:_HEADER.size].tobytes())
+        if magic != MAGIC or version != _VERSION:
+            raise ValueError(f"{path} n'est pas une Q-table binaire.")
+        self.key_bytes = key_bytes
+        self.count = count
+
+        offset = _HEADER.size
+        actions = self.data[offset:offset + 2 * num_actions].view(np.int8)
+        self.actions = [tuple(action) for action
+                        in actions.reshape(num_actions, 2).tolist()]
+        self.action_index = {action: i for i, action
+                             in enumerate(self.actions)}
+        offset = _align(offset + 2 * num_actions)
+        self.keys = self.data[offset:offset + count * key_bytes].view(
+            f"S{key_bytes}")
+        offset = _align(offset + count * key_bytes)
+        self.values = self.data[offset:].view("<f4").reshape(
+            count + 1, num_actions)
+        self.visits = None
+        self.changed = None
+        self.generation = 0
+
+    @property
+    def num_states(self):
+        return self.count
+
+    def __len__(self):
+        return self.count * len(self.actions)
+
+    def get_id(self, state):
+        """Retourne l'indice d'un état, ou None s'il est inconnu."""
+        if state.bit_length() > 8 * self.key_bytes:
+            return None
+        # Les octets nuls de fin sont ignorés par les chaînes NumPy
+        key = state.to_bytes(self.key_bytes, "big").rstrip(b"\0")
+        index = int(self.keys.searchsorted(key))
+        if index < self.count and self.keys[index] == key:
+            return index
+        return None
+
+    def intern(self, state):
+        """
+        Retourne l'indice d'un état, ou celui de la ligne à zéro s'il
+        est inconnu (la table n'est jamais modifiée).
+        """
+        state_id = self.get_id(state)
+        return self.count if state_id is None else state_id
+
+    def max_values(self, state_ids):
+        return self.values[state_ids].max(axis=1)
+
+    def best_actions(self, state_ids):
+        return self.values[state_ids].argmax(axis=1)
+
+    def to_q_table(self):
+        """Copie modifiable (QTable) de la table, pour reprendre
+        l'entraînement."""
+        table = QTable(self.actions, capacity=self.count + 1)
+        for key in self.keys.tolist():
+            table.intern(int.from_bytes(key.ljust(self.key_bytes, b"\0"),
+                                        "big"))
+        table.values[:self.count] = self.values[:self.count]
+        return table
+
+    snapshot = to_q_table
@@ -0,0 +1,320 @@
+"""
+Entraînement parallèle sur plusieurs processus.
+
+Chaque worker possède son propre Game et sa propre copie de la Q-table.
+Le coordinateur distribue les sessions par tranches de `sync_interval`
+sessions par worker ; à la fin de chaque tranche, les workers renvoient
+les Q-values modifiées (valeurs, deltas et nombre de visites), le
+coordinateur les fusionne dans la table principale puis renvoie les
+lignes fusionnées à tous les workers.
+
+Règles de fusion :
+- "average" : moyenne des valeurs des workers pondérée par les visites ;
+- "sum" : somme des deltas de tous les workers.
+
+En mode partagé (train_shared), il n'y a ni copie ni fusion : tous les
+workers lisent et écrivent la même SharedQTable, les Q-values sans
+verrou.
+"""
+from contextlib import redirect_stdout
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import numpy as np
+from src.checkpoint import Checkpointer
+from src.game import Game
+from src.q_agent import QLearningAgent
+from src.q_table import QTable
+from src.seeding import BOARD_STREAM, derive_seed
+from src.shared_q_table import SharedQTable
+
+MERGE_RULES = ("average", "sum")
+
+# Secondes entre deux vérifications de la cadence de sauvegarde en mode
+# partagé
+_POLL_SECONDS = 1.0
+
+
+def _make_worker(worker_id, config, seed):
+    """
+    Agent et jeu d'un worker, avec des générateurs aléatoires propres
+    dérivés de la graine de base et du numéro du worker
+    (voir src.seeding).
+    """
+    if seed is not None:
+        config = dict(config, seed=seed)
+    agent = QLearningAgent.from_config(config, worker_id)
+    game = Game(config.get("board_size", 10), display=False,
+                victory_condition=config.get("victory_condition", 10),
+                mode="train", rewards=config["rewards"],
+                seed=derive_seed(config.get("seed"), worker_id,
+                                 BOARD_STREAM))
+    return agent, game
+
+
+def _worker(worker_id, conn, config, seed):
+    """
+    Boucle d'un worker : reçoit une tranche de sessions avec les lignes
+    fusionnées à appliquer, joue les sessions et renvoie ses changements.
+    """
+    # Les messages des parties de tous les workers se mélangeraient
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        agent, game = _make_worker(worker_id, config, seed)
+        q_table = agent.q_table = QTable(agent.actions, track_visits=True)
+
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            sessions, epsilon, decay_rate, states, values = message
+
+            # Appliquer la table fusionnée
+            for state, row in zip(states, values):
+                state_id = q_table.intern(state)
+                q_table.values[state_id] = row
+            base_count = q_table.num_states
+            base = q_table.values[:base_count].copy()
+            q_table.visits[:] = 0
+
+            agent.epsilon = epsilon
+            total_length = 0
+            total_score = 0
+            for _ in range(sessions):
+                game.reset()
+                length, score = game.run(step=False, agent=agent,
+                                         train=True)
+                total_length += length
+                total_score += score
+                agent.decay_epsilon(decay_rate=decay_rate)
+
+            # Lignes modifiées pendant la tranche
+            touched = np.flatnonzero(
+                q_table.visits[:q_table.num_states].any(axis=1))
+            new_values = q_table.values[touched]
+            deltas = new_values.copy()
+            known = touched < base_count
+            deltas[known] -= base[touched[known]]
+            conn.send(([q_table.states[i] for i in touched], new_values,
+                       deltas, q_table.visits[touched], total_length,
+                       total_score))
+    conn.close()
+
+
+def _shared_worker(worker_id, q_table, config, seed, sessions, epsilon,
+                   decay_rate):
+    """
+    Worker du mode partagé : joue ses sessions directement sur la
+    Q-table partagée.
+    """
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        agent, game = _make_worker(worker_id, config, seed)
+        agent.q_table = q_table
+        agent.epsilon = epsilon
+        for _ in range(sessions):
+            game.reset()
+            game.run(step=False, agent=agent, train=True)
+            q_table.add_sessions()
+            agent.decay_epsilon(decay_rate=decay_rate)
+        q_table.close()
+
+
+def merge_results(q_table, results, rule="average"):
+    """
+    Fusionne les changements des workers dans la Q-table principale.
+    :param q_table: QTable principale.
+    :param results: Liste de tuples (états, valeurs, deltas, visites)
+    renvoyés par les workers.
+    :param rule: "average" ou "sum".
+    :return: Identifiants (dans q_table) des lignes modifiées.
+    """
+    if rule not in MERGE_RULES:
+        raise ValueError(f"Règle de fusion inconnue : {rule}")
+    ids = [np.array([q_table.intern(state) for state in states],
+                    dtype=np.int64)
+           for states, _, _, _ in results]
+    if not ids:
+        return np.array([], dtype=np.int64)
+    touched, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+    if rule == "sum":
+        for state_ids, (_, _, deltas, _) in zip(ids, results):
+            q_table.values[state_ids] += deltas
+        q_table.mark_rows(touched)
+        return touched
+
+    weighted = np.zeros((len(touched), len(q_table.actions)))
+    weights = np.zeros((len(touched), len(q_table.actions)))
+    start = 0
+    for state_ids, (_, values, _, visits) in zip(ids, results):
+        rows = inverse[start:start + len(state_ids)]
+        start += len(state_ids)
+        weighted[rows] += visits * values
+        weights[rows] += visits
+    visited = weights > 0
+    merged = q_table.values[touched]
+    merged[visited] = weighted[visited] / weights[visited]
+    q_table.values[touched] = merged
+    q_table.mark_rows(touched)
+    return touched
+
+
+def train_parallel(agent, config, training_sessions, model_name,
+                   workers=2, sync_interval=10, merge="average", seed=None,
+                   checkpoint=None):
+    """
+    Entraîne l'agent avec plusieurs processus.
+    :param agent: Agent dont la Q-table sert de table principale.
+    :param config: Configuration (config.yaml) utilisée par les workers.
+    :param training_sessions: Nombre total de sessions.
+    :param model_name: Nom du fichier de sauvegarde dans save/.
+    :param workers: Nombre de processus.
+    :param sync_interval: Sessions jouées par chaque worker entre deux
+    fusions.
+    :param merge: Règle de fusion ("average" ou "sum").
+    :param seed: Graine de base des workers (défaut : `seed` de la
+    configuration).
+    :param checkpoint: Cadence des sauvegardes (voir train_agent).
+    :return: Tuple (longueur moyenne, score moyen).
+    """
+    if merge not in MERGE_RULES:
+        raise ValueError(f"Règle de fusion inconnue : {merge}")
+    context = multiprocessing.get_context()
+    connections = []
+    processes = []
+    for worker_id in range(workers):
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=_worker, daemon=True,
+                                  args=(worker_id, child_conn, config, seed))
+        process.start()
+        child_conn.close()
+        connections.append(parent_conn)
+        processes.append(process)
+
+    # Au premier envoi, toute la table ; ensuite, les lignes fusionnées
+    q_table = agent.q_table
+    push_states = list(q_table.states)
+    push_values = q_table.values[:q_table.num_states]
+    # Chaque worker fait décroître epsilon comme si les sessions de tous
+    # les workers étaient jouées à la suite
+    decay_rate = 0.99 ** workers
+    done = 0
+    total_length = 0
+    total_score = 0
+    checkpointer = Checkpointer(agent, model_name, **(checkpoint or {}))
+    try:
+        while done < training_sessions:
+            remaining = training_sessions - done
+            shares = [min(sync_interval, remaining // workers +
+                          (1 if i < remaining % workers else 0))
+                      for i in range(workers)]
+            for conn, sessions in zip(connections, shares):
+                conn.send((sessions, agent.epsilon, decay_rate,
+                           push_states, push_values))
+            results = [conn.recv() for conn in connections]
+
+            touched = merge_results(q_table, [result[:4]
+                                              for result in results], merge)
+            push_states = [q_table.states[i] for i in touched]
+            push_values = q_table.values[touched]
+
+            round_sessions = sum(shares)
+            done += round_sessions
+            total_length += sum(result[4] for result in results)
+            total_score += sum(result[5] for result in results)
+            for _ in range(round_sessions):
+                agent.decay_epsilon()
+            checkpointer.maybe_save(done)
+            print(f"Sessions {done}/{training_sessions} - "
+                  f"états : {q_table.num_states}, lignes fusionnées : "
+                  f"{len(touched)}, epsilon : {agent.epsilon:.4f}")
+    finally:
+        checkpointer.close()
+        for conn in connections:
+            try:
+                conn.send(None)
+            except OSError:
+                pass  # Worker déjà arrêté
+        for process in processes:
+            process.join()
+    return (round(total_length / max(1, done), 2),
+            round(total_score / max(1, done), 2))
+
+
+def _check_workers(processes):
+    """
+    Arrête l'entraînement si un worker s'est terminé en erreur : les
+    autres workers sont arrêtés et une RuntimeError est levée (la
+    sauvegarde finale a lieu comme pour une interruption).
+    """
+    failed = [(worker_id, process.exitcode)
+              for worker_id, process in enumerate(processes)
+              if process.exitcode not in (None, 0)]
+    if not failed:
+        return
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+    details = ", ".join(f"worker {worker_id} (code {code})"
+                        for worker_id, code in failed)
+    raise RuntimeError(f"Entraînement partagé interrompu : {details}.")
+
+
+def train_shared(agent, config, training_sessions, model_name, workers=2,
+                 capacity=1 << 20, seed=None, checkpoint=None):
+    """
+    Entraîne l'agent avec plusieurs processus partageant une seule
+    Q-table en mémoire partagée (mises à jour des Q-values sans verrou).
+    :param agent: Agent dont la Q-table initialise la table partagée et
+    reçoit le résultat.
+    :param config: Configuration (config.yaml) utilisée par les workers.
+    :param training_sessions: Nombre total de sessions.
+    :param model_name: Nom du fichier de sauvegarde dans save/.
+    :param workers: Nombre de processus.
+    :param capacity: Nombre d'états de la table partagée (puissance de 2).
+    :param seed: Graine de base des workers (défaut : `seed` de la
+    configuration).
+    :param checkpoint: Cadence des sauvegardes (voir train_agent).
+    """
+    shared = SharedQTable(agent.actions, capacity=capacity)
+    try:
+        shared.load(agent.q_table)
+        context = multiprocessing.get_context()
+        processes = []
+        for worker_id in range(workers):
+            sessions = (training_sessions // workers +
+                        (1 if worker_id < training_sessions % workers
+                         else 0))
+            process = context.Process(
+                target=_shared_worker, daemon=True,
+                args=(worker_id, shared, config, seed, sessions,
+                      agent.epsilon, 0.99 ** workers))
+            process.start()
+            processes.append(process)
+
+        # Sauvegardes (copies de la table partagée) à la cadence
+        # configurée tant que des workers tournent
+        agent.q_table = shared
+        checkpointer = Checkpointer(agent, model_name, **(checkpoint or {}))
+        try:
+            running = list(processes)
+            while running:
+                wait([process.sentinel for process in running],
+                     timeout=_POLL_SECONDS)
+                running = [process for process in running
+                           if process.is_alive()]
+                _check_workers(processes)
+                if running and checkpointer.maybe_save(shared.sessions):
+                    print(f"Sessions {shared.sessions}/{training_sessions} "
+                          f"- états : {shared.num_states}")
+            for process in processes:
+                process.join()
+            _check_workers(processes)
+        finally:
+            # Sauvegarde finale de la table ordinaire
+            agent.q_table = shared.snapshot()
+            checkpointer.close()
+        for _ in range(shared.sessions):
+            agent.decay_epsilon()
+    finally:
+        shared.close()
+        shared.unlink()
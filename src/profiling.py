@@ -0,0 +1,121 @@
+"""
+Mesure du temps passé dans chaque phase d'un pas d'entraînement
+(vision, encodage, choix de l'action, déplacement, récompense, mise à
+jour de la Q-table, affichage, sauvegarde).
+
+Sans mesure, le jeu utilise NULL_TIMER, dont les appels ne font rien :
+la boucle de jeu et Board.step n'ont qu'un seul chemin, mesuré ou non.
+"""
+import cProfile
+import json
+import pstats
+import time
+
+# Ordre d'affichage des phases connues
+PHASES = ("vision", "encoding", "action", "move", "reward", "update",
+          "render", "wait", "checkpoint")
+
+
+class PhaseTimer:
+    """Cumule la durée (perf_counter_ns) et le nombre de passages de
+    chaque phase."""
+
+    enabled = True
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    @staticmethod
+    def start():
+        """Début d'une mesure."""
+        return time.perf_counter_ns()
+
+    def stop(self, phase, start):
+        """
+        Termine la mesure d'une phase commencée à `start`.
+        :return: L'instant de fin, qui peut servir de début à la phase
+        suivante.
+        """
+        now = time.perf_counter_ns()
+        self.totals[phase] = self.totals.get(phase, 0) + now - start
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+        return now
+
+    def merge(self, other):
+        """Ajoute les mesures d'un autre timer à celui-ci."""
+        for phase, total in other.totals.items():
+            self.totals[phase] = self.totals.get(phase, 0) + total
+            self.counts[phase] = (self.counts.get(phase, 0) +
+                                  other.counts[phase])
+
+    def reset(self):
+        self.totals.clear()
+        self.counts.clear()
+
+    def to_dict(self):
+        """
+        Mesures par phase : {phase: {"total_ms", "count", "mean_us"}}.
+        """
+        ordered = [phase for phase in PHASES if phase in self.totals]
+        ordered += sorted(set(self.totals) - set(PHASES))
+        return {phase: {"total_ms": round(self.totals[phase] / 1e6, 3),
+                        "count": self.counts[phase],
+                        "mean_us": round(self.totals[phase] /
+                                         self.counts[phase] / 1e3, 3)}
+                for phase in ordered}
+
+    def report(self, title="Temps par phase"):
+        """Tableau lisible des mesures, avec la part de chaque phase."""
+        phases = self.to_dict()
+        total = sum(self.totals.values()) or 1
+        lines = [f"{title} :"]
+        for phase, measure in phases.items():
+            share = self.totals[phase] / total
+            lines.append(f"  {phase:<11}{measure['total_ms']:>11.1f} ms "
+                         f"{share:>6.1%} {measure['count']:>9} x "
+                         f"{measure['mean_us']:>9.2f} µs")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """Écrit les mesures en JSON."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class NullTimer:
+    """Timer qui ne mesure rien (instrumentation désactivée)."""
+
+    enabled = False
+
+    @staticmethod
+    def start():
+        return 0
+
+    def stop(self, phase, start):
+        return 0
+
+    def merge(self, other):
+        pass
+
+    def reset(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def run_profiled(path, function, *args, **kwargs):
+    """
+    Exécute `function` sous cProfile, écrit les statistiques dans
+    `path` (lisibles avec pstats ou snakeviz) et affiche les fonctions
+    les plus coûteuses.
+    :return: Le résultat de `function`.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        print(f"Profil écrit dans {path}")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
@@ -1,11 +1,25 @@
 import random
-import os
 import pickle
+import numpy as np
+from src.board import ACTIONS
+from src.cache import LRUCache
+from src.checkpoint import LOG_SUFFIX, replay_log, write_atomic
+from src.encoding import (DIRECTIONS, encode_rays, encode_vision,
+                          vision_key, rays_key, rays_to_vision,
+                          is_legacy_q_table, convert_q_table)
+from src.mapped_q_table import MappedQTable, is_mapped_file
+from src.q_table import QTable
+from src.replay import ReplayBuffer
+from src.seeding import (AGENT_STREAM, REPLAY_STREAM, derive_seed,
+                          make_rng)
 
 
 class QLearningAgent:
     def __init__(self, board_size, actions, rewards,
-                 alpha=0.4, gamma=0.9, epsilon=0.99):
+                 alpha=0.4, gamma=0.9, epsilon=0.99,
+                 vision_cache_size=65536, replay_capacity=0,
+                 replay_ratio=0.0, batch_size=32, rng=None,
+                 replay_seed=None):
         """
         Initialise l'agent de Q-learning.
         :param board_size: Taille du plateau.
@@ -14,6 +28,16 @@ class QLearningAgent:
         :param alpha: Taux d'apprentissage.
         :param gamma: Facteur de prediction pour les récompenses futures.
         :param epsilon: Probabilité d'exploration.
+        :param vision_cache_size: Nombre maximal de visions brutes dont
+        l'état redimensionné est gardé en cache (plateaux autres que 10).
+        :param replay_capacity: Taille de la mémoire de replay
+        (0 la désactive).
+        :param replay_ratio: Nombre moyen de transitions rejouées par
+        transition jouée.
+        :param batch_size: Transitions rejouées à la fois.
+        :param rng: Générateur (random.Random) de l'exploration ; par
+        défaut le module random (état global).
+        :param replay_seed: Graine de l'échantillonnage du replay.
         """
         self.board_size = board_size
         self.actions = actions
@@ -21,7 +45,31 @@ class QLearningAgent:
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
-        self.q_table = {}
+        self.q_table = QTable(actions)
+        self.vision_cache = LRUCache(vision_cache_size)
+        self.rng = rng if rng is not None else random
+        self.replay = (ReplayBuffer(replay_capacity, seed=replay_seed)
+                       if replay_capacity else None)
+        self.replay_ratio = replay_ratio
+        self.batch_size = batch_size
+        self.replay_credit = 0.0
+
+    @classmethod
+    def from_config(cls, config, worker_id=0):
+        """
+        Crée un agent à partir de la configuration (config.yaml).
+        :param worker_id: Numéro du worker, pour dériver les graines
+        (voir src.seeding).
+        """
+        training = config["training"]
+        seed = config.get("seed")
+        return cls(config.get("board_size", 10), ACTIONS, config["rewards"],
+                   vision_cache_size=training.get("vision_cache_size", 65536),
+                   replay_capacity=training.get("replay_capacity", 0),
+                   replay_ratio=training.get("replay_ratio", 0.0),
+                   batch_size=training.get("batch_size", 32),
+                   rng=make_rng(seed, worker_id, AGENT_STREAM),
+                   replay_seed=derive_seed(seed, worker_id, REPLAY_STREAM))
 
     def get_global_state(self, vision):
         """
@@ -43,6 +91,42 @@ class QLearningAgent:
             state.append((direction, tuple(truncated)))
         return tuple(state)
 
+    def get_state(self, vision):
+        """
+        Encode la vision en un entier compact servant de clé d'état.
+        Pour un plateau différent de 10x10, la vision est d'abord
+        redimensionnée ; le résultat est mis en cache.
+        :param vision: Dictionnaire des visions par direction.
+        :return: Entier représentant l'état global (voir src.encoding).
+        """
+        if self.board_size == 10:
+            return encode_vision(vision)
+        # Le redimensionnement ne dépend que de la vision brute
+        key = vision_key(vision)
+        state = self.vision_cache.get(key)
+        if state is None:
+            state = encode_vision(self.get_resized_vision(vision))
+            self.vision_cache.put(key, state)
+        return state
+
+    def get_state_from_rays(self, rays):
+        """
+        Équivalent de get_state pour des rayons de codes de cases
+        (voir Board.get_rays), sans construire de dictionnaire de vision
+        sauf en cas d'échec du cache.
+        :param rays: Quatre rayons (haut, bas, gauche, droite).
+        :return: Entier représentant l'état global.
+        """
+        if self.board_size == 10:
+            return encode_rays(rays)
+        key = rays_key(rays)
+        state = self.vision_cache.get(key)
+        if state is None:
+            state = encode_vision(self.get_resized_vision(
+                rays_to_vision(rays)))
+            self.vision_cache.put(key, state)
+        return state
+
     def get_resized_vision(self, vision, total_visible=9):
         """
         Redimensionne les visions opposées (up-down ou left-right)
@@ -185,19 +269,23 @@ class QLearningAgent:
         :return: Une action valide
         (tuple représentant une direction, ex : (-1, 0)).
         """
-        # Obtenir l'état global
-        if self.board_size == 10:
-            global_state = self.get_global_state(vision)
-        else:
-            new_vision = self.get_resized_vision(vision)
-            global_state = self.get_global_state(new_vision)
-        q_values = {}
+        blocked = [bool(vision[direction]) and
+                   vision[direction][0] in ["W", "S"]
+                   for direction in DIRECTIONS]
+        return self.select_action(self.get_state(vision), blocked)
 
+    def select_action(self, global_state, blocked):
+        """
+        Choisit une action à partir d'un état déjà encodé.
+        :param global_state: État global (voir get_state).
+        :param blocked: Pour chaque direction (haut, bas, gauche, droite),
+        True si la case voisine est un mur ou le serpent.
+        :return: Une action valide
+        (tuple représentant une direction, ex : (-1, 0)).
+        """
         # Initialiser les Q-values pour chaque action si elles n'existent pas
-        for action in self.actions:
-            if (global_state, action) not in self.q_table:
-                self.q_table[(global_state, action)] = 0  # Initialiser à 0
-            q_values[action] = self.q_table[(global_state, action)]
+        state_id = self.q_table.intern(global_state)
+        q_values = self.q_table.values[state_id]
 
         # direction_to_action = {
         #     "up": (-1, 0),
@@ -215,23 +303,23 @@ class QLearningAgent:
             #       f"Action: {action}, Q-value: {q_value}")
 
         # Exploration vs exploitation
-        if random.uniform(0, 1) < self.epsilon:  # Exploration
+        if self.rng.uniform(0, 1) < self.epsilon:  # Exploration
             # Filtrer les actions avec des Q-values au-dessus du seuil
             valid_actions = [
-                action for action, (direction, state_key)
-                in zip(self.actions, global_state)
-                if not (state_key and state_key[0] in ["W", "S"])
+                action for action, is_blocked
+                in zip(self.actions, blocked)
+                if not is_blocked
             ]
 
             if valid_actions:
                 # Choisir aléatoirement une action parmi celles valides
-                action = random.choice(valid_actions)
+                action = self.rng.choice(valid_actions)
             else:
                 # Si aucune action valide, choisir une action aléatoire
-                action = random.choice(self.actions)
+                action = self.rng.choice(self.actions)
         else:  # Exploitation
             # Choisir l'action avec la meilleure Q-value
-            action = max(self.actions, key=lambda a: q_values[a])
+            action = self.actions[int(q_values.argmax())]
             # opposite_direction = (-current_direction[0],
             #                       -current_direction[1])
             # action = max(
@@ -243,58 +331,184 @@ class QLearningAgent:
 
         return action
 
-    def update_q_value(self, vision, action, reward, next_vision):
+    def update_q_value(self, vision, action, reward, next_vision,
+                       done=False):
         """
         Met à jour la Q-value associée à l'état global et à l'action.
         :param vision: Vision actuelle (avant action).
         :param action: Action effectuée.
         :param reward: Récompense reçue.
         :param next_vision: Vision après action.
+        :param done: True si l'action a terminé la partie.
         """
         # Obtenir les états globaux avant et après
-        current_state = self.get_global_state(vision)
-        next_state = self.get_global_state(next_vision)
+        self.update_q(self.get_state(vision), action, reward,
+                      self.get_state(next_vision), done)
 
+    def update_q(self, current_state, action, reward, next_state,
+                 done=False):
+        """
+        Met à jour la Q-value à partir d'états déjà encodés.
+        :param current_state: État global avant l'action.
+        :param action: Action effectuée.
+        :param reward: Récompense reçue.
+        :param next_state: État global après l'action.
+        :param done: True si l'action a terminé la partie : il n'y a pas
+        de récompense future (et l'état suivant n'est pas créé).
+        """
         # Initialiser les Q-values si nécessaires
-        if (current_state, action) not in self.q_table:
-            self.q_table[(current_state, action)] = 0
-        for next_action in self.actions:
-            if (next_state, next_action) not in self.q_table:
-                self.q_table[(next_state, next_action)] = 0
+        current_id = self.q_table.intern(current_state)
+        next_id = -1 if done else self.q_table.intern(next_state)
+        action_id = self.q_table.action_index[action]
+        values = self.q_table.values
 
         # Calculer la nouvelle Q-value
-        current_q = self.q_table[(current_state, action)]
-        max_future_q = max(self.q_table[(next_state, next_action)]
-                           for next_action in self.actions)
+        current_q = values[current_id, action_id]
+        max_future_q = 0.0 if done else values[next_id].max()
         new_q = ((1 - self.alpha) * current_q +
                  self.alpha * (reward + self.gamma * max_future_q))
 
         # Mettre à jour la Q-value
-        self.q_table[(current_state, action)] = new_q
+        values[current_id, action_id] = new_q
+        if self.q_table.visits is not None:
+            self.q_table.visits[current_id, action_id] += 1
+        if self.q_table.changed is not None:
+            self.q_table.changed.add(current_id * values.shape[1] + action_id)
+
+        if self.replay is not None:
+            self.replay.add(current_id, action_id, reward, next_id, done)
+            self.replay_credit += self.replay_ratio
+            while (self.replay_credit >= self.batch_size and
+                   len(self.replay) >= self.batch_size):
+                self.replay_credit -= self.batch_size
+                self.update_ids(*self.replay.sample(self.batch_size))
+
+    def update_batch(self, states, actions, rewards, next_states, dones):
+        """
+        Met à jour les Q-values d'un lot de transitions (voir update_ids).
+        :param states: États globaux avant l'action.
+        :param actions: Actions effectuées (tuples).
+        :param rewards: Récompenses reçues.
+        :param next_states: États globaux après l'action.
+        :param dones: True pour les transitions qui terminent la partie.
+        """
+        dones = np.asarray(dones, dtype=bool)
+        state_ids = np.array([self.q_table.intern(state) for state in states],
+                             dtype=np.int64)
+        # Pas d'entrée créée pour les états terminaux
+        next_ids = np.array([-1 if done else self.q_table.intern(state)
+                             for state, done
+                             in zip(next_states, dones.tolist())],
+                            dtype=np.int64)
+        action_ids = np.array([self.q_table.action_index[action]
+                               for action in actions], dtype=np.int64)
+        self.update_ids(state_ids, action_ids, rewards, next_ids, dones)
+
+    def update_ids(self, state_ids, action_ids, rewards, next_ids, dones):
+        """
+        Applique la mise à jour de Bellman à un lot de transitions
+        données par identifiants de la Q-table.
+
+        Toutes les cibles sont calculées avec les Q-values d'avant le
+        lot. Un même (état, action) présent k fois reçoit ses k mises à
+        jour dans l'ordre du lot, comme si elles étaient appliquées une
+        par une avec ces cibles. Les transitions terminales n'ont pas de
+        récompense future.
+        :param state_ids: Identifiants des états avant l'action.
+        :param action_ids: Indices des actions.
+        :param rewards: Récompenses reçues.
+        :param next_ids: Identifiants des états suivants (ignorés pour
+        les transitions terminales).
+        :param dones: True pour les transitions qui terminent la partie.
+        """
+        values = self.q_table.values
+        state_ids = np.asarray(state_ids, dtype=np.int64)
+        action_ids = np.asarray(action_ids, dtype=np.int64)
+        dones = np.asarray(dones, dtype=bool)
+        future = np.where(dones, 0.0, values[np.where(dones, 0, next_ids)]
+                          .max(axis=1))
+        targets = np.asarray(rewards, dtype=np.float64) + self.gamma * future
+
+        # Regrouper les (état, action) identiques en gardant l'ordre du lot
+        cells = state_ids * values.shape[1] + action_ids
+        order = np.argsort(cells, kind="stable")
+        unique, starts, counts = np.unique(cells[order], return_index=True,
+                                           return_counts=True)
+        group = np.repeat(np.arange(len(unique)), counts)
+        rank = np.arange(len(order)) - starts[group]
+        # La j-ième des k mises à jour est atténuée par les k - 1 - j
+        # suivantes
+        keep = 1 - self.alpha
+        weights = self.alpha * keep ** (counts[group] - 1 - rank)
+        contribution = np.bincount(group, weights=weights * targets[order],
+                                   minlength=len(unique))
+
+        rows, columns = np.divmod(unique, values.shape[1])
+        values[rows, columns] = (keep ** counts * values[rows, columns] +
+                                 contribution)
+        if self.q_table.visits is not None:
+            self.q_table.visits[rows, columns] += counts.astype(np.int32)
+        if self.q_table.changed is not None:
+            self.q_table.changed.update(unique.tolist())
 
     def decay_epsilon(self, min_epsilon=0.1, decay_rate=0.99):
         self.epsilon = max(min_epsilon, self.epsilon * decay_rate)
 
     def save_model(self, filename):
-        os.makedirs("save", exist_ok=True)
         try:
-            with open(f"save/{filename}", 'wb') as f:
-                pickle.dump(self.q_table, f)
+            q_table = self.q_table
+            if not isinstance(q_table, QTable):
+                # Table partagée : sauvegarder une copie ordinaire
+                q_table = q_table.snapshot()
+            write_atomic(f"save/{filename}", q_table)
             print(f"Modèle sauvegardé dans {filename},"
-                  f"nombre d'états : {len(self.q_table)}")
+                  f"nombre d'états : {q_table.num_states}")
         except Exception as e:
             print(f"Erreur lors de la sauvegarde : {e}")
 
-    def load_model(self, filename):
+    def load_model(self, filename, read_only=False):
+        """
+        Charge une Q-table depuis save/ : pickle (avec son journal
+        éventuel) ou format binaire exporté (src.mapped_q_table).
+        :param filename: Nom du fichier dans save/.
+        :param read_only: Garde une table binaire projetée en mémoire
+        (mode modèle) au lieu de la copier dans une QTable modifiable.
+        :raise FileNotFoundError: en lecture seule, si le modèle est
+        absent (rien à évaluer).
+        """
+        if self.replay is not None:
+            self.replay.clear()  # Identifiants de l'ancienne table
         try:
+            if is_mapped_file(f"save/{filename}"):
+                q_table = MappedQTable(f"save/{filename}")
+                if not read_only:
+                    q_table = q_table.to_q_table()
+                self.q_table = q_table
+                print(f"Modèle chargé depuis {filename}, "
+                      f"nombre d'états : {self.q_table.num_states}")
+                return
             with open(f"save/{filename}", 'rb') as f:
-                self.q_table = pickle.load(f)
+                q_table = pickle.load(f)
+            if isinstance(q_table, dict):
+                if is_legacy_q_table(q_table):
+                    # Ancien format : états sous forme de tuples de chaînes
+                    q_table = convert_q_table(q_table)
+                    print("Modèle converti vers l'encodage entier des états.")
+                q_table = QTable.from_dict(q_table, self.actions)
+            replayed = replay_log(f"save/{filename}{LOG_SUFFIX}", q_table)
+            if replayed:
+                print(f"Journal rejoué : {replayed} modifications.")
+            # La table en mémoire ne correspond plus à la base sauvegardée
+            q_table.generation = 0
+            self.q_table = q_table
             print(f"Modèle chargé depuis {filename}, "
-                  f"nombre d'états : {len(self.q_table)}")
+                  f"nombre d'états : {self.q_table.num_states}")
         except FileNotFoundError:
+            if read_only:
+                raise
             print(f"Erreur : Le fichier {filename} est introuvable. "
                   f"Nouvelle table initialisée.")
-            self.q_table = {}  # Repartir de zéro
+            self.q_table = QTable(self.actions)  # Repartir de zéro
         except Exception as e:
             print(f"Erreur lors du chargement : {e}")
-            self.q_table = {}  # Repartir de zéro
+            self.q_table = QTable(self.actions)  # Repartir de zéro
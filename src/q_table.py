@@ -0,0 +1,193 @@
+import numpy as np
+
+
+class QTable:
+    """
+    Q-table compacte : chaque état est interné une seule fois en un
+    identifiant entier, et les Q-values de toutes ses actions sont
+    rangées sur une ligne d'un tableau float32 [nombre d'états, actions].
+
+    L'accès par clé (état, action) comme un dictionnaire reste possible
+    pour la compatibilité avec l'ancien format.
+    """
+
+    def __init__(self, actions, capacity=1024, track_visits=False):
+        """
+        :param actions: Liste des actions possibles [(0, 1), (0, -1), ...].
+        :param capacity: Nombre de lignes réservées au départ.
+        :param track_visits: Compte les mises à jour de chaque
+        (état, action) dans `visits` (utilisé par l'entraînement parallèle).
+        """
+        self.actions = list(actions)
+        self.action_index = {action: i for i, action
+                             in enumerate(self.actions)}
+        self.state_ids = {}
+        self.states = []
+        self.values = np.zeros((max(1, capacity), len(self.actions)),
+                               dtype=np.float32)
+        self.visits = (np.zeros(self.values.shape, dtype=np.int32)
+                       if track_visits else None)
+        # Identifiant de la sauvegarde complète (voir src.checkpoint)
+        self.generation = 0
+        # Cases (état * actions + action) modifiées depuis la dernière
+        # sauvegarde incrémentale, si suivies (voir track_changes)
+        self.changed = None
+
+    @property
+    def num_states(self):
+        """Nombre d'états internés."""
+        return len(self.states)
+
+    def intern(self, state):
+        """
+        Retourne l'identifiant d'un état, en le créant (Q-values à 0)
+        s'il est inconnu.
+        """
+        state_id = self.state_ids.get(state)
+        if state_id is None:
+            state_id = len(self.states)
+            if state_id == len(self.values):
+                self._grow()
+            self.state_ids[state] = state_id
+            self.states.append(state)
+        return state_id
+
+    def get_id(self, state):
+        """Retourne l'identifiant d'un état, ou None s'il est inconnu."""
+        return self.state_ids.get(state)
+
+    def _grow(self):
+        """Double la capacité du tableau des Q-values."""
+        values = np.zeros((2 * len(self.values), len(self.actions)),
+                          dtype=np.float32)
+        values[:len(self.values)] = self.values
+        self.values = values
+        if self.visits is not None:
+            visits = np.zeros(values.shape, dtype=np.int32)
+            visits[:len(self.visits)] = self.visits
+            self.visits = visits
+
+    def track_changes(self):
+        """
+        Active le suivi des Q-values modifiées par les mises à jour
+        de l'agent (sauvegarde incrémentale, voir src.checkpoint).
+        """
+        self.changed = set()
+
+    def take_changes(self):
+        """
+        Retourne les cases modifiées depuis l'appel précédent et remet
+        le suivi à zéro.
+        :return: Tableau trié des cases (état * actions + action).
+        """
+        cells = np.fromiter(self.changed, dtype=np.int64,
+                            count=len(self.changed))
+        self.changed = set()
+        cells.sort()
+        return cells
+
+    def mark_rows(self, state_ids):
+        """Marque toutes les actions de ces états comme modifiées."""
+        if self.changed is not None:
+            width = len(self.actions)
+            for state_id in np.asarray(state_ids).tolist():
+                self.changed.update(range(state_id * width,
+                                          (state_id + 1) * width))
+
+    def max_values(self, state_ids):
+        """Meilleure Q-value de chaque état d'un tableau d'identifiants."""
+        return self.values[state_ids].max(axis=1)
+
+    def best_actions(self, state_ids):
+        """Indice de la meilleure action de chaque état (première en cas
+        d'égalité)."""
+        return self.values[state_ids].argmax(axis=1)
+
+    # Accès façon dictionnaire {(état, action): valeur}
+
+    def __len__(self):
+        return len(self.states) * len(self.actions)
+
+    def __contains__(self, key):
+        state, action = key
+        return state in self.state_ids and action in self.action_index
+
+    def __getitem__(self, key):
+        state, action = key
+        return float(self.values[self.state_ids[state],
+                                 self.action_index[action]])
+
+    def __setitem__(self, key, value):
+        state, action = key
+        # intern() peut agrandir (donc remplacer) self.values
+        state_id = self.intern(state)
+        action_id = self.action_index[action]
+        self.values[state_id, action_id] = value
+        if self.changed is not None:
+            self.changed.add(state_id * len(self.actions) + action_id)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self):
+        for state in self.states:
+            for action in self.actions:
+                yield state, action
+
+    __iter__ = keys
+
+    def items(self):
+        for state_id, state in enumerate(self.states):
+            for action_id, action in enumerate(self.actions):
+                yield (state, action), float(self.values[state_id,
+                                                         action_id])
+
+    def to_dict(self):
+        """Convertit la table en dictionnaire {(état, action): valeur}."""
+        return dict(self.items())
+
+    @classmethod
+    def from_dict(cls, q_table, actions):
+        """
+        Construit une table à partir d'un dictionnaire
+        {(état, action): valeur}.
+        """
+        table = cls(actions, capacity=len(q_table) // len(actions) + 1)
+        for key, value in q_table.items():
+            table[key] = value
+        return table
+
+    def copy(self):
+        """
+        Copie indépendante de la table (lignes utilisées seulement),
+        que l'entraînement peut continuer à modifier pendant qu'elle est
+        sauvegardée.
+        """
+        table = QTable.__new__(QTable)
+        table.__setstate__(self.__getstate__())
+        return table
+
+    # Sérialisation : uniquement les lignes utilisées
+
+    def __getstate__(self):
+        return {
+            "actions": self.actions,
+            "states": self.states,
+            "values": self.values[:len(self.states)],
+            "generation": self.generation,
+        }
+
+    def __setstate__(self, data):
+        self.actions = data["actions"]
+        self.action_index = {action: i for i, action
+                             in enumerate(self.actions)}
+        self.states = list(data["states"])
+        self.state_ids = dict(zip(self.states, range(len(self.states))))
+        self.values = np.array(data["values"], dtype=np.float32)
+        if len(self.values) == 0:
+            self.values = np.zeros((1, len(self.actions)), dtype=np.float32)
+        self.visits = None
+        self.generation = data.get("generation", 0)
+        self.changed = None
@@ -0,0 +1,64 @@
+"""
+Politique de rafraîchissement de l'affichage pendant l'entraînement et
+le mode modèle.
+
+- "realtime" : chaque pas est dessiné puis la boucle attend pour jouer
+  `speed` pas par seconde (comportement historique, toujours utilisé
+  en mode joueur).
+- "every" : la simulation tourne à pleine vitesse et l'écran est
+  redessiné tous les `every_steps` pas.
+- "fps" : la simulation tourne à pleine vitesse et l'écran est
+  redessiné au plus `fps` fois par seconde.
+
+Dans les deux derniers cas, l'image dessinée est celle du plateau au
+moment du rafraîchissement ; les pas intermédiaires ne sont pas
+affichés.
+"""
+import time
+
+POLICIES = ("realtime", "every", "fps")
+
+
+class RenderPolicy:
+    def __init__(self, policy="realtime", every_steps=100, fps=30.0):
+        """
+        :param policy: "realtime", "every" ou "fps".
+        :param every_steps: Pas entre deux images (politique "every").
+        :param fps: Images par seconde au plus (politique "fps").
+        """
+        if policy not in POLICIES:
+            print(f"Politique d'affichage inconnue : {policy}, "
+                  f"utilisation de realtime.")
+            policy = "realtime"
+        self.policy = policy
+        self.realtime = policy == "realtime"
+        self.every_steps = max(1, int(every_steps))
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.steps = 0
+        self.next_frame = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Politique décrite par la section `render` de la configuration.
+        :param config: Dictionnaire de la section (ou None).
+        """
+        config = config or {}
+        return cls(config.get("policy", "realtime"),
+                   config.get("every_steps", 100), config.get("fps", 30.0))
+
+    def should_render(self):
+        """Indique si le pas courant doit être dessiné."""
+        if self.policy == "every":
+            self.steps += 1
+            if self.steps < self.every_steps:
+                return False
+            self.steps = 0
+            return True
+        if self.policy == "fps":
+            now = time.monotonic()
+            if now < self.next_frame:
+                return False
+            self.next_frame = now + self.interval
+            return True
+        return True
@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Mémoire de transitions de taille fixe (tampon circulaire) rangée
+    dans des tableaux NumPy parallèles. Les états sont les identifiants
+    de la Q-table (voir QTable.intern), stables tant que la table n'est
+    pas remplacée ; l'état suivant d'une transition terminale vaut -1.
+    """
+
+    def __init__(self, capacity, seed=None):
+        """
+        :param capacity: Nombre maximal de transitions gardées ; au-delà,
+        les plus anciennes sont écrasées.
+        :param seed: Graine du générateur utilisé pour l'échantillonnage.
+        """
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state_id, action_id, reward, next_id, done):
+        """Ajoute une transition, en écrasant la plus ancienne si pleine."""
+        i = self.position
+        self.states[i] = state_id
+        self.actions[i] = action_id
+        self.rewards[i] = reward
+        self.next_states[i] = next_id
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Tire uniformément `batch_size` transitions (avec remise).
+        :return: Tuple (états, actions, récompenses, états suivants,
+        terminés) de tableaux NumPy.
+        """
+        indices = self.rng.integers(0, self.size, size=batch_size)
+        return (self.states[indices], self.actions[indices],
+                self.rewards[indices], self.next_states[indices],
+                self.dones[indices])
+
+    def clear(self):
+        """Vide la mémoire (par exemple quand la Q-table est remplacée)."""
+        self.position = 0
+        self.size = 0
@@ -0,0 +1,42 @@
+"""
+Graines des générateurs aléatoires.
+
+Chaque plateau, agent et mémoire de replay possède son propre
+générateur : aucun état aléatoire global n'est partagé. À partir de la
+graine de la configuration (`seed`), chaque flux reçoit sa propre
+graine :
+
+    derive_seed(seed, worker_id, stream)
+
+où `worker_id` est le numéro du worker (0 sans parallélisme) et
+`stream` l'un des flux ci-dessous. La dérivation passe par
+numpy.random.SeedSequence : les flux sont indépendants entre eux et
+reproductibles d'une exécution à l'autre. Avec `seed` à None, chaque
+générateur est initialisé aléatoirement.
+"""
+import random
+import numpy as np
+
+# Flux aléatoires d'un worker
+BOARD_STREAM = 0   # Serpent initial et pommes (Board)
+AGENT_STREAM = 1   # Exploration (QLearningAgent)
+REPLAY_STREAM = 2  # Échantillonnage de la mémoire de replay
+
+
+def derive_seed(seed, worker_id=0, stream=BOARD_STREAM):
+    """
+    Graine d'un flux aléatoire d'un worker.
+    :param seed: Graine de base (None : aléatoire).
+    :param worker_id: Numéro du worker.
+    :param stream: BOARD_STREAM, AGENT_STREAM ou REPLAY_STREAM.
+    :return: Entier, ou None si `seed` est None.
+    """
+    if seed is None:
+        return None
+    sequence = np.random.SeedSequence([seed, worker_id, stream])
+    return int(sequence.generate_state(1, np.uint64)[0])
+
+
+def make_rng(seed, worker_id=0, stream=BOARD_STREAM):
+    """random.Random initialisé avec la graine dérivée d'un flux."""
+    return random.Random(derive_seed(seed, worker_id, stream))
@@ -0,0 +1,206 @@
+"""
+Q-table en mémoire partagée pour l'entraînement multi-processus
+(style Hogwild).
+
+Tous les processus lisent et écrivent la même table : un index d'états
+à adressage ouvert (sondage linéaire) de capacité fixe et un tableau
+float32 [capacité, actions] des Q-values. L'identifiant d'un état est
+son emplacement dans la table.
+
+La lecture d'un emplacement occupé se fait sans verrou. Un emplacement
+libre n'est pris qu'avec le verrou de sa bande (emplacement modulo le
+nombre de verrous) : la clé est écrite avant que l'emplacement soit
+marqué occupé, et l'état de l'emplacement est relu sous le verrou, si
+bien que deux processus ne peuvent pas prendre le même emplacement. Si
+un verrou n'est pas obtenu à temps (processus mort pendant une
+insertion), l'insertion échoue avec TimeoutError : le worker s'arrête
+et l'entraînement partagé avec lui (voir train_shared).
+
+Seules les mises à jour concurrentes d'une même Q-value peuvent se
+perdre, ce qui est accepté (c'est le principe de Hogwild).
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from src.encoding import state_key_bytes
+from src.q_table import QTable
+
+# État d'un emplacement
+EMPTY_SLOT = 0
+READY_SLOT = 1
+
+_FIBONACCI = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+# En-tête : nombre de sessions jouées (int64)
+_HEADER_BYTES = 8
+
+# Verrous d'insertion (partagés par bandes d'emplacements) et délai
+# au-delà duquel une insertion échoue
+LOCK_STRIPES = 64
+LOCK_TIMEOUT = 5.0
+
+
+class SharedQTable:
+    def __init__(self, actions, capacity=1 << 20, key_bytes=None,
+                 name=None, locks=None):
+        """
+        Crée une nouvelle table partagée, ou s'attache à une table
+        existante si `name` est donné.
+        :param actions: Liste des actions possibles.
+        :param capacity: Nombre d'emplacements (puissance de 2).
+        :param key_bytes: Taille d'une clé d'état en octets.
+        :param name: Nom du segment de mémoire partagée existant.
+        :param locks: Verrous d'insertion et verrou du compteur de
+        sessions de la table existante.
+        """
+        if capacity & (capacity - 1):
+            raise ValueError("La capacité doit être une puissance de 2.")
+        self.actions = list(actions)
+        self.action_index = {action: i for i, action
+                             in enumerate(self.actions)}
+        self.capacity = capacity
+        self.shift = 64 - (capacity.bit_length() - 1)
+        self.key_bytes = key_bytes or state_key_bytes()
+        self.visits = None
+        self.changed = None
+        if locks is None:
+            context = multiprocessing.get_context()
+            locks = ([context.Lock() for _ in range(LOCK_STRIPES)],
+                     context.Lock())
+        self.locks, self.sessions_lock = locks
+
+        keys_size = capacity * self.key_bytes
+        values_offset = _HEADER_BYTES + keys_size + capacity
+        values_offset += -values_offset % 8  # Alignement
+        size = values_offset + capacity * len(self.actions) * 4
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        buf = self.shm.buf
+        self.header = np.ndarray(1, dtype=np.int64, buffer=buf)
+        self.keys = buf[_HEADER_BYTES:_HEADER_BYTES + keys_size]
+        self.flags = buf[_HEADER_BYTES + keys_size:
+                         _HEADER_BYTES + keys_size + capacity]
+        self.values = np.ndarray((capacity, len(self.actions)),
+                                 dtype=np.float32, buffer=buf,
+                                 offset=values_offset)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def num_states(self):
+        """Nombre d'états insérés (compte des emplacements occupés)."""
+        flags = np.frombuffer(self.flags, dtype=np.uint8)
+        return int(np.count_nonzero(flags == READY_SLOT))
+
+    def __len__(self):
+        return self.num_states * len(self.actions)
+
+    def _find(self, state, create):
+        key = state.to_bytes(self.key_bytes, "little")
+        size = self.key_bytes
+        mask = self.capacity - 1
+        # Hachage de Fibonacci : les bits de poids faible des états
+        # (longueur du dernier rayon) varient peu
+        slot = ((hash(state) * _FIBONACCI) & _MASK64) >> self.shift
+        for _ in range(self.capacity):
+            if self.flags[slot] == READY_SLOT:
+                if self.keys[slot * size:(slot + 1) * size] == key:
+                    return slot
+            elif not create:
+                return None
+            elif self._claim(slot, key):
+                return slot
+            elif self.keys[slot * size:(slot + 1) * size] == key:
+                return slot  # Inséré au même instant ailleurs
+            slot = (slot + 1) & mask
+        if create:
+            raise MemoryError("SharedQTable pleine : augmentez la capacité.")
+        return None
+
+    def _claim(self, slot, key):
+        """
+        Prend un emplacement libre pour `key`, sous le verrou de sa
+        bande.
+        :return: True si l'emplacement a été pris ; False s'il est
+        occupé (à comparer par l'appelant).
+        :raise TimeoutError: si le verrou n'est pas obtenu à temps.
+        """
+        lock = self.locks[slot % len(self.locks)]
+        if not lock.acquire(timeout=LOCK_TIMEOUT):
+            raise TimeoutError(f"SharedQTable : verrou de l'emplacement "
+                               f"{slot} non obtenu (processus arrêté "
+                               f"pendant une insertion ?).")
+        try:
+            if self.flags[slot] != EMPTY_SLOT:
+                return False
+            size = self.key_bytes
+            self.keys[slot * size:(slot + 1) * size] = key
+            self.flags[slot] = READY_SLOT
+            return True
+        finally:
+            lock.release()
+
+    def intern(self, state):
+        """
+        Retourne l'emplacement d'un état, en l'insérant (Q-values à 0)
+        s'il est inconnu.
+        """
+        return self._find(state, create=True)
+
+    def get_id(self, state):
+        """Retourne l'emplacement d'un état, ou None s'il est inconnu."""
+        return self._find(state, create=False)
+
+    def add_sessions(self, count=1):
+        """Compte des sessions jouées (suivi de progression)."""
+        with self.sessions_lock:
+            self.header[0] += count
+
+    @property
+    def sessions(self):
+        return int(self.header[0])
+
+    def load(self, q_table):
+        """Copie le contenu d'une QTable dans la table partagée."""
+        for state_id, state in enumerate(q_table.states):
+            slot = self.intern(state)
+            self.values[slot] = q_table.values[state_id]
+
+    def snapshot(self):
+        """
+        Copie la table partagée dans une QTable ordinaire
+        (pour la sauvegarde).
+        """
+        flags = np.frombuffer(self.flags, dtype=np.uint8)
+        slots = np.flatnonzero(flags == READY_SLOT)
+        size = self.key_bytes
+        table = QTable(self.actions, capacity=len(slots) + 1)
+        for slot in slots.tolist():
+            state = int.from_bytes(self.keys[slot * size:(slot + 1) * size],
+                                   "little")
+            state_id = table.intern(state)
+            table.values[state_id] = self.values[slot]
+        return table
+
+    def close(self):
+        """Détache ce processus du segment partagé."""
+        self.header = None
+        self.values = None
+        self.keys.release()
+        self.flags.release()
+        self.shm.close()
+
+    def unlink(self):
+        """Détruit le segment partagé (à appeler par le créateur)."""
+        self.shm.unlink()
+
+    def __reduce__(self):
+        # Un processus enfant s'attache au même segment
+        return (SharedQTable, (self.actions, self.capacity, self.key_bytes,
+                               self.name, (self.locks, self.sessions_lock)))
@@ -1,4 +1,9 @@
+from collections import Counter, deque
+
+
 class Snake:
+    __slots__ = ("body", "cells", "size", "alive")
+
     def __init__(self, initial_position, size):
         """
         Initialise le serpent avec une position de départ.
@@ -7,7 +12,9 @@ class Snake:
         :param size: Taille du plateau (nombre de cases sur
         un côté, pour un plateau carré).
         """
-        self.body = initial_position  # Corps du serpent, liste de tuples
+        self.body = deque(initial_position)  # Corps du serpent, tête à gauche
+        # Nombre de segments sur chaque case (la queue peut être dupliquée)
+        self.cells = Counter(self.body)
         self.size = size  # Taille du plateau
         self.alive = True  # Indique si le serpent est vivant
 
@@ -28,21 +35,34 @@ class Snake:
 
         # Vérifier les collisions avec le mur et le corps
         if (
-            new_head in self.body or
+            new_head in self.cells or
             not (0 <= new_head[0] < self.size and 0 <= new_head[1] < self.size)
         ):
             self.alive = False
             return False
 
         # Ajouter la nouvelle tête
-        self.body.insert(0, new_head)
+        self.body.appendleft(new_head)
+        self.cells[new_head] += 1
 
         # Retirer la queue si le serpent ne grandit pas
         if not grow:
-            self.body.pop()
+            self._pop_tail()
 
         return True
 
+    def _pop_tail(self):
+        """
+        Retire le dernier segment et libère sa case si plus aucun
+        segment ne l'occupe.
+        """
+        tail = self.body.pop()
+        if self.cells[tail] == 1:
+            del self.cells[tail]
+        else:
+            self.cells[tail] -= 1
+        return tail
+
     def grow(self):
         """
         Le serpent grandit d'une case.
@@ -54,7 +74,7 @@ class Snake:
         Réduit la taille du serpent en supprimant la queue.
         """
         if len(self.body) > 1:
-            self.body.pop()
+            self._pop_tail()
         else:
             self.alive = False  # Si le serpent n'a plus de corps, il meurt
 
@@ -64,6 +84,13 @@ class Snake:
         """
         if len(self.body) > 0:
             self.body.append(self.body[-1])
+            self.cells[self.body[-1]] += 1
+
+    def occupies(self, pos):
+        """
+        Indique si une case est occupée par au moins un segment.
+        """
+        return pos in self.cells
 
     def is_alive(self):
         """
@@ -73,6 +100,6 @@ class Snake:
 
     def get_body(self):
         """
-        Retourne la liste des segments du serpent.
+        Retourne la séquence des segments du serpent, tête en premier.
         """
         return self.body
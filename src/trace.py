@@ -0,0 +1,296 @@
+"""
+Enregistrement compact des parties et relecture.
+
+Une partie est entièrement déterminée par la graine du générateur de
+son plateau (serpent initial et pommes, voir Game.new_board) et par la
+suite des actions jouées. Chaque partie est enregistrée dans une
+archive par exécution, à laquelle les parties sont ajoutées les unes
+après les autres :
+
+    en-tête (_HEADER)
+    positions initiales : serpent, pommes vertes, pommes rouges
+        (x, y sur un octet chacun)
+    actions : indice dans ACTIONS sur 2 bits, 4 actions par octet
+
+Un enregistrement tronqué en fin d'archive (interruption) est ignoré.
+
+Relecture :
+
+    python -m src.trace save/traces.trc --list
+    python -m src.trace save/traces.trc --pick longest --speed 20
+    python -m src.trace save/traces.trc --episode 12 --start 150
+"""
+import argparse
+import random
+import struct
+import sys
+import numpy as np
+from src.board import ACTIONS, Board
+
+_MAGIC = b"TRCE"
+_VERSION = 1
+# magic, version, taille, victoire, graine, session, pas, longueur
+# finale, score, segments, pommes vertes, pommes rouges
+_HEADER = struct.Struct("<4sBBHQIIHiBBB")
+
+# Indice de chaque action dans ACTIONS
+ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+# Parties choisies par --pick
+PICKS = ("longest", "worst", "best", "last")
+
+
+def pack_actions(actions):
+    """
+    Range des indices d'actions (0 à 3) sur 2 bits, 4 par octet.
+    :param actions: bytearray ou liste d'indices.
+    :return: bytes de longueur ceil(len(actions) / 4).
+    """
+    codes = np.zeros(-(-len(actions) // 4) * 4, dtype=np.uint8)
+    codes[:len(actions)] = np.frombuffer(bytes(actions), dtype=np.uint8)
+    return (codes[0::4] | codes[1::4] << 2 | codes[2::4] << 4 |
+            codes[3::4] << 6).tobytes()
+
+
+def unpack_actions(data, steps):
+    """Inverse de pack_actions : liste des `steps` indices d'actions."""
+    packed = np.frombuffer(data, dtype=np.uint8)
+    codes = np.empty(len(packed) * 4, dtype=np.uint8)
+    for shift in range(4):
+        codes[shift::4] = (packed >> (2 * shift)) & 3
+    return codes[:steps].tolist()
+
+
+class EpisodeTrace:
+    """Partie enregistrée."""
+
+    def __init__(self, size, victory_condition, seed, snake, green_apples,
+                 red_apples, actions, session=0, length=0, score=0):
+        """
+        :param seed: Graine du générateur du plateau.
+        :param snake: Corps initial du serpent, tête en premier.
+        :param green_apples: Pommes vertes initiales.
+        :param red_apples: Pommes rouges initiales.
+        :param actions: Indices des actions jouées (voir ACTIONS).
+        :param session: Numéro de la session.
+        :param length: Longueur finale du serpent.
+        :param score: Score final.
+        """
+        self.size = size
+        self.victory_condition = victory_condition
+        self.seed = seed
+        self.snake = [tuple(pos) for pos in snake]
+        self.green_apples = [tuple(pos) for pos in green_apples]
+        self.red_apples = [tuple(pos) for pos in red_apples]
+        self.actions = actions
+        self.session = session
+        self.length = length
+        self.score = score
+
+    @classmethod
+    def start(cls, board, seed, session=0):
+        """Trace vide d'une partie qui commence sur `board`."""
+        return cls(board.size, board.victory_condition, seed,
+                   board.snake.get_body(), board.green_apples,
+                   board.red_apples, bytearray(), session)
+
+    def to_bytes(self):
+        header = _HEADER.pack(_MAGIC, _VERSION, self.size,
+                              self.victory_condition, self.seed,
+                              self.session, len(self.actions), self.length,
+                              self.score, len(self.snake),
+                              len(self.green_apples), len(self.red_apples))
+        positions = bytes(value for pos in self.snake + self.green_apples +
+                          self.red_apples for value in pos)
+        return header + positions + pack_actions(self.actions)
+
+    def make_board(self, rewards=None):
+        """
+        Plateau initial de la partie, recréé à partir de la graine.
+        Un message signale une différence avec les positions
+        enregistrées (code du plateau modifié depuis l'enregistrement).
+        """
+        board = Board(self.size, self.victory_condition, rewards,
+                      rng=random.Random(self.seed))
+        if (list(board.snake.get_body()) != self.snake or
+                board.green_apples != self.green_apples or
+                board.red_apples != self.red_apples):
+            print("Attention : le plateau recréé diffère de celui "
+                  "enregistré.")
+        return board
+
+
+class TraceWriter:
+    """Archive de parties ouverte en ajout."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "ab")
+
+    def write(self, trace):
+        self.file.write(trace.to_bytes())
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_traces(path):
+    """
+    Lit toutes les parties d'une archive.
+    :return: Liste d'EpisodeTrace.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    traces = []
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        (magic, version, size, victory_condition, seed, session, steps,
+         length, score, snake_count, green_count,
+         red_count) = _HEADER.unpack_from(data, offset)
+        if magic != _MAGIC or version != _VERSION:
+            print(f"Erreur : enregistrement invalide à l'octet {offset} "
+                  f"de {path}.")
+            break
+        start = offset + _HEADER.size
+        count = snake_count + green_count + red_count
+        end = start + 2 * count + -(-steps // 4)
+        if end > len(data):
+            break  # Enregistrement tronqué
+        raw = data[start:start + 2 * count]
+        positions = [(raw[i], raw[i + 1]) for i in range(0, len(raw), 2)]
+        actions = unpack_actions(data[start + 2 * count:end], steps)
+        traces.append(EpisodeTrace(
+            size, victory_condition, seed, positions[:snake_count],
+            positions[snake_count:snake_count + green_count],
+            positions[snake_count + green_count:], actions, session,
+            length, score))
+        offset = end
+    return traces
+
+
+def pick_trace(traces, pick):
+    """
+    :param pick: "longest" (serpent final le plus long), "worst" (le
+    plus court), "best" (meilleur score) ou "last".
+    """
+    if pick == "longest":
+        return max(traces, key=lambda trace: trace.length)
+    if pick == "worst":
+        return min(traces, key=lambda trace: trace.length)
+    if pick == "best":
+        return max(traces, key=lambda trace: trace.score)
+    return traces[-1]
+
+
+def replay(trace, display=None, speed=10, start_step=0):
+    """
+    Rejoue une partie sur un Board, et sur `display` s'il est fourni.
+    :param speed: Pas par seconde à l'affichage (0 : sans attente).
+    :param start_step: Premier pas affiché ; les précédents sont joués
+    sans affichage.
+    :return: Tuple (longueur finale du serpent, score).
+    """
+    board = trace.make_board()
+    score = 0
+    if display is not None:
+        import pygame
+
+        clock = pygame.time.Clock()
+    for step, code in enumerate(trace.actions):
+        if display is not None and step >= start_step:
+            display.draw_board(board.get_state(), score=score,
+                               elapsed_time=step / speed if speed else 0.0,
+                               snake_length=len(board.snake.get_body()))
+            if speed:
+                clock.tick(speed)
+        result = board.move_snake(ACTIONS[code])
+        if result == "green":
+            score += 1
+        if not result or board.is_victory():
+            break
+    length = len(board.snake.get_body())
+    if display is not None:
+        title = "Victory" if board.is_victory() else "Game Over"
+        display.show_end_screen(title, score, len(trace.actions) / speed
+                                if speed else 0.0, length,
+                                f"session {trace.session}")
+        display.wait_end_screen()
+    return length, score
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Relecture des parties enregistrées.")
+    parser.add_argument("archive", help="Archive de parties (.trc).")
+    parser.add_argument("--list", action="store_true",
+                        help="Liste les parties de l'archive.")
+    parser.add_argument("--check", action="store_true",
+                        help="Rejoue toutes les parties sans affichage et "
+                             "vérifie leur résultat.")
+    parser.add_argument("--episode", type=int, default=None,
+                        help="Indice de la partie dans l'archive.")
+    parser.add_argument("--pick", choices=PICKS, default="last",
+                        help="Partie à rejouer sans --episode.")
+    parser.add_argument("--speed", type=float, default=10,
+                        help="Pas par seconde (0 : sans attente).")
+    parser.add_argument("--start", type=int, default=0,
+                        help="Premier pas affiché.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        traces = read_traces(args.archive)
+    except FileNotFoundError:
+        print(f"Erreur : archive {args.archive} introuvable.")
+        return 1
+    if not traces:
+        print("Aucune partie dans l'archive.")
+        return 1
+
+    if args.list:
+        for i, trace in enumerate(traces):
+            print(f"{i:6} session {trace.session:6} pas "
+                  f"{len(trace.actions):6} longueur {trace.length:4} "
+                  f"score {trace.score:4}")
+        return 0
+    if args.check:
+        errors = 0
+        for i, trace in enumerate(traces):
+            if replay(trace) != (trace.length, trace.score):
+                print(f"Partie {i} : résultat différent à la relecture.")
+                errors += 1
+        print(f"{len(traces) - errors}/{len(traces)} parties identiques.")
+        return 1 if errors else 0
+
+    if args.episode is not None:
+        if not 0 <= args.episode < len(traces):
+            print(f"Erreur : partie {args.episode} absente "
+                  f"({len(traces)} parties).")
+            return 1
+        trace = traces[args.episode]
+    else:
+        trace = pick_trace(traces, args.pick)
+
+    import pygame
+    from src.display import Display
+
+    pygame.init()
+    display = Display(board_size=trace.size)
+    pygame.display.set_caption(f"Snake RL - session {trace.session}")
+    length, score = replay(trace, display, args.speed, args.start)
+    pygame.quit()
+    print(f"Session {trace.session} : longueur {length}, score {score}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
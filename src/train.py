@@ -0,0 +1,265 @@
+"""
+Entraînement et évaluation sans affichage.
+
+Ce module ne charge jamais pygame : il peut tourner sur une machine
+sans écran, par exemple :
+
+    python -m src.train --config config.yaml --sessions 5000
+"""
+import argparse
+import os
+import yaml
+from src.checkpoint import Checkpointer
+from src.game import Game
+from src.mapped_q_table import export_q_table
+from src.profiling import PhaseTimer, run_profiled
+from src.parallel import train_parallel, train_shared
+from src.q_agent import QLearningAgent
+from src.seeding import derive_seed
+from src.trace import TraceWriter
+
+
+def load_config(config_file="config.yaml"):
+    """Charge la configuration depuis config.yaml."""
+    with open(config_file, "r") as file:
+        return yaml.safe_load(file)
+
+
+def means_calcul(length, score, session):
+    if session == 0:
+        raise ValueError("Le nombre de sessions ne peut pas être 0.")
+
+    mean_length = round(length / session, 2)
+    mean_score = round(score / session, 2)
+
+    return mean_length, mean_score
+
+
+def train_agent(game, agent, training_sessions, model_name, step=False,
+                checkpoint=None, timer=None):
+    """
+    Boucle d'entraînement : enchaîne les sessions, sauvegarde le modèle
+    et fait décroître epsilon.
+    :param game: Instance de Game (avec ou sans affichage).
+    :param agent: Agent Q-learning à entraîner.
+    :param training_sessions: Nombre de sessions à jouer.
+    :param model_name: Nom du fichier de sauvegarde dans save/.
+    :param step: Active le mode pas à pas (affichage uniquement).
+    :param checkpoint: Cadence des sauvegardes, section `checkpoint` de
+    la configuration (every_sessions, every_seconds).
+    :param timer: PhaseTimer (voir src.profiling) qui reçoit le temps
+    passé dans chaque phase ; le détail de chaque session et le total
+    sont affichés.
+    :return: Tuple (longueur moyenne, score moyen).
+    """
+    # Charger l'état actuel si disponible
+    try:
+        agent.load_model(model_name)
+        print("Modèle chargé à partir de la sauvegarde actuelle.")
+    except FileNotFoundError:
+        print("Aucun modèle actuel trouvé, démarrage à partir de zéro.")
+    checkpointer = Checkpointer(agent, model_name, **(checkpoint or {}))
+    try:
+        return _train_sessions(game, agent, training_sessions, model_name,
+                               step, checkpointer, timer)
+    finally:
+        # Sauvegarde finale, même en cas d'interruption
+        checkpointer.close()
+
+
+def _train_sessions(game, agent, training_sessions, model_name, step,
+                    checkpointer, timer):
+    if timer is not None:
+        game.timer = PhaseTimer()  # Mesures de la session en cours
+    session_timer = game.timer
+    total_length = 0
+    total_score = 0
+    means_length = 0
+    means_score = 0
+    for session in range(1, training_sessions + 1):
+        game.reset()
+        print(f"Début de la session {session}/{training_sessions}")
+        length, score = game.run(
+            step=step,
+            agent=agent,
+            train=True,
+            current_session=session,
+            total_sessions=training_sessions,
+            means_score=means_score,
+            means_length=means_length,
+        )
+        total_length += length
+        total_score += score
+        means_length, means_score = means_calcul(total_length,
+                                                 total_score, session)
+
+        # Sauvegarde en arrière-plan si la cadence est atteinte
+        start = session_timer.start()
+        checkpointer.maybe_save(session)
+
+        # Sauvegarder les modèles spécifiques pour les sessions importantes
+        if session in {1, 10, 100}:
+            checkpointer.save(f"{model_name}_{session}_sessions.pkl")
+        session_timer.stop("checkpoint", start)
+        agent.decay_epsilon()
+        print(f"\nSession terminée. Nouvelle valeur "
+              f"d'epsilon : {agent.epsilon}")
+        if agent.board_size != 10:
+            print(f"Cache de vision : {agent.vision_cache.stats()}")
+        if timer is not None:
+            print(session_timer.report(f"Temps par phase (session "
+                                       f"{session})"))
+            timer.merge(session_timer)
+            session_timer.reset()
+        print()
+    if timer is not None:
+        print(timer.report("Temps par phase (total)"))
+    return means_length, means_score
+
+
+def evaluate_agent(game, agent, sessions):
+    """
+    Joue plusieurs parties sans exploration ni apprentissage.
+    :return: Tuple (longueur moyenne, score moyen).
+    """
+    agent.epsilon = 0.0
+    total_length = 0
+    total_score = 0
+    for session in range(1, sessions + 1):
+        game.reset()
+        length, score = game.run(step=False, agent=agent, train=False)
+        total_length += length
+        total_score += score
+    return means_calcul(total_length, total_score, sessions)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Entraînement / évaluation Snake RL sans affichage.")
+    parser.add_argument("--config", default="config.yaml",
+                        help="Fichier de configuration YAML.")
+    parser.add_argument("--sessions", type=int, default=None,
+                        help="Nombre de sessions (défaut : config).")
+    parser.add_argument("--model", default=None,
+                        help="Nom du modèle dans save/ (défaut : config).")
+    parser.add_argument("--eval", action="store_true",
+                        help="Évalue le modèle au lieu de l'entraîner.")
+    parser.add_argument("--export", default=None, metavar="NAME",
+                        help="Exporte le modèle au format binaire en "
+                             "lecture seule (save/NAME).")
+    parser.add_argument("--timing", action="store_true",
+                        help="Affiche le temps passé dans chaque phase.")
+    parser.add_argument("--timing-output", default=None, metavar="FILE",
+                        help="Écrit le temps par phase en JSON "
+                             "(active --timing).")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="Exécute sous cProfile et écrit les "
+                             "statistiques dans FILE.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processus d'entraînement (défaut : config).")
+    parser.add_argument("--sync-interval", type=int, default=None,
+                        help="Sessions par worker entre deux fusions.")
+    parser.add_argument("--merge", choices=["average", "sum"], default=None,
+                        help="Règle de fusion des Q-tables des workers.")
+    parser.add_argument("--shared", action="store_true",
+                        help="Workers sur une Q-table en mémoire partagée.")
+    parser.add_argument("--trace", default=None, metavar="FILE",
+                        help="Ajoute chaque partie à l'archive FILE "
+                             "(relecture : python -m src.trace FILE).")
+    return parser.parse_args(argv)
+
+
+def make_timer(config, timing=False, timing_output=None):
+    """
+    PhaseTimer si la mesure du temps par phase est demandée (options ou
+    section `profiling` de la configuration), sinon None.
+    """
+    profiling = config.get("profiling") or {}
+    if timing or timing_output or profiling.get("timing"):
+        return PhaseTimer()
+    return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = load_config(args.config)
+    profile = args.profile or (config.get("profiling") or {}).get("profile")
+    if profile:
+        run_profiled(profile, run, args, config)
+    else:
+        run(args, config)
+
+
+def run(args, config):
+    board_size = config.get("board_size", 10)
+    victory_condition = config.get("victory_condition", 10)
+    rewards = config["rewards"]
+    sessions = args.sessions or config["training"]["sessions"]
+    model_name = args.model or config["model"]["name"]
+    parallel = config.get("parallel") or {}
+    workers = args.workers or parallel.get("workers", 1)
+    timing_output = (args.timing_output or
+                     (config.get("profiling") or {}).get("timing_output"))
+    timer = make_timer(config, args.timing, timing_output)
+
+    agent = QLearningAgent.from_config(config)
+    game = Game(board_size, display=False,
+                victory_condition=victory_condition,
+                mode="model" if args.eval else "train", rewards=rewards,
+                seed=derive_seed(config.get("seed")))
+
+    if args.export:
+        if not os.path.exists(f"save/{model_name}"):
+            print(f"Erreur : Modèle {model_name} introuvable.")
+            return
+        agent.load_model(model_name)
+        export_q_table(agent.q_table, f"save/{args.export}")
+        print(f"Modèle exporté dans {args.export}.")
+        return
+    trace_path = args.trace or (config.get("trace") or {}).get("path")
+    if trace_path and workers > 1 and not args.eval:
+        print("Enregistrement des parties ignoré avec plusieurs workers.")
+    elif trace_path:
+        game.trace_writer = TraceWriter(trace_path)
+    if timer is not None and workers > 1 and not args.eval:
+        print("Mesure du temps par phase ignorée avec plusieurs workers.")
+        timer = None
+    if args.eval:
+        try:
+            agent.load_model(model_name, read_only=True)
+        except FileNotFoundError:
+            print(f"Erreur : Modèle {model_name} introuvable.")
+            return
+        if timer is not None:
+            game.timer = timer
+        mean_length, mean_score = evaluate_agent(game, agent, sessions)
+        if timer is not None:
+            print(timer.report())
+    elif workers > 1 and (args.shared or parallel.get("shared", False)):
+        agent.load_model(model_name)
+        train_shared(agent, config, sessions, model_name, workers=workers,
+                     capacity=parallel.get("capacity", 1 << 20),
+                     checkpoint=config.get("checkpoint"))
+        print(f"Entraînement partagé terminé, epsilon : {agent.epsilon}")
+        return
+    elif workers > 1:
+        agent.load_model(model_name)
+        mean_length, mean_score = train_parallel(
+            agent, config, sessions, model_name, workers=workers,
+            sync_interval=(args.sync_interval or
+                           parallel.get("sync_interval", 10)),
+            merge=args.merge or parallel.get("merge", "average"),
+            checkpoint=config.get("checkpoint"))
+    else:
+        mean_length, mean_score = train_agent(
+            game, agent, sessions, model_name,
+            checkpoint=config.get("checkpoint"), timer=timer)
+    if game.trace_writer is not None:
+        game.trace_writer.close()
+    if timer is not None and timing_output:
+        timer.save(timing_output)
+    print(f"Longueur moyenne : {mean_length}, score moyen : {mean_score}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+from functools import lru_cache
+import numpy as np
+from src.board import (ACTIONS, DEFAULT_REWARDS, EMPTY, SNAKE, GREEN, RED,
+                       WALL, ray_slices)
+
+
+@lru_cache(maxsize=None)
+def ray_indices(size):
+    """
+    Version NumPy de board.ray_slices : tableau [cases, 4, size + 1]
+    des indices des cases de chaque rayon, complété par l'indice 0
+    (un coin de la bordure, donc un mur).
+    """
+    width = size + 2
+    cells = np.arange(width * width)
+    table = np.zeros((width * width, 4, size + 1), dtype=np.int64)
+    for idx, rays in enumerate(ray_slices(size)):
+        if rays is None:
+            continue
+        for direction, ray in enumerate(rays):
+            indices = cells[ray]
+            table[idx, direction, :len(indices)] = indices
+    table.flags.writeable = False
+    return table
+
+
+class VecBoard:
+    """
+    N plateaux simulés en parallèle dans des tableaux NumPy.
+
+    Chaque plateau utilise la même grille à plat que Board (bordure de
+    murs, case (x, y) à l'indice (x + 1) * width + (y + 1)). Le corps de
+    chaque serpent est un tampon circulaire d'indices de la grille,
+    tête en premier. Les règles et les récompenses sont celles de
+    Board.move_snake et Board.calculate_reward.
+    """
+
+    def __init__(self, num_envs, size=10, victory_condition=10,
+                 rewards=None, seed=None):
+        """
+        :param num_envs: Nombre de plateaux simulés.
+        :param size: Taille d'un plateau.
+        :param victory_condition: Longueur du serpent pour la victoire.
+        :param rewards: Dictionnaire des récompenses (comme Board).
+        :param seed: Graine du générateur aléatoire.
+        """
+        self.num_envs = num_envs
+        self.size = size
+        self.width = size + 2
+        self.victory_condition = victory_condition
+        self.rewards = rewards or dict(DEFAULT_REWARDS)
+        self.rng = np.random.default_rng(seed)
+
+        num_cells = self.width * self.width
+        # Grille vide de référence (bordure de murs)
+        self.empty_grid = np.full(num_cells, WALL, dtype=np.uint8)
+        self.empty_grid.reshape(self.width, self.width)[1:-1, 1:-1] = EMPTY
+        # Déplacement dans la grille à plat pour chaque action
+        self.deltas = np.array([dx * self.width + dy for dx, dy in ACTIONS],
+                               dtype=np.int64)
+        self.rays = ray_indices(size)
+
+        # La queue peut être dupliquée une fois après une pomme verte
+        self.capacity = size * size + 2
+        self.grids = np.empty((num_envs, num_cells), dtype=np.uint8)
+        self.bodies = np.zeros((num_envs, self.capacity), dtype=np.int64)
+        self.head_ptr = np.zeros(num_envs, dtype=np.int64)
+        self.lengths = np.zeros(num_envs, dtype=np.int64)
+        self.green_apples = np.full((num_envs, 2), -1, dtype=np.int64)
+        self.red_apples = np.full((num_envs, 1), -1, dtype=np.int64)
+        self.scores = np.zeros(num_envs, dtype=np.int64)
+        self.victories = np.zeros(num_envs, dtype=bool)
+        self.reset()
+
+    def reset(self):
+        """
+        Réinitialise tous les plateaux.
+        :return: Grilles de tous les plateaux.
+        """
+        self.reset_envs(np.arange(self.num_envs))
+        return self.grids
+
+    def reset_envs(self, envs):
+        """
+        Réinitialise les plateaux donnés : nouveau serpent de 3 cases
+        en ligne, deux pommes vertes et une pomme rouge.
+        :param envs: Indices des plateaux à réinitialiser.
+        """
+        count = len(envs)
+        if count == 0:
+            return
+        self.grids[envs] = self.empty_grid
+
+        # Tête à l'intérieur du plateau, corps dans une direction valide
+        heads = self.rng.integers(1, self.size - 1, size=(count, 2))
+        steps = np.array(ACTIONS)
+        tails = heads[:, None, :] + 2 * steps[None, :, :]
+        valid = np.all((tails >= 0) & (tails < self.size), axis=2)
+        keys = np.where(valid, self.rng.random((count, len(ACTIONS))), -1.0)
+        body_step = steps[np.argmax(keys, axis=1)]
+
+        for i in range(3):
+            cells = heads + i * body_step
+            idx = (cells[:, 0] + 1) * self.width + cells[:, 1] + 1
+            self.bodies[envs, i] = idx
+            self.grids[envs, idx] = SNAKE
+        self.head_ptr[envs] = 0
+        self.lengths[envs] = 3
+        self.scores[envs] = 0
+
+        self.green_apples[envs] = -1
+        self.red_apples[envs] = -1
+        self.green_apples[envs, 0] = self.spawn_apples(envs, GREEN)
+        self.green_apples[envs, 1] = self.spawn_apples(envs, GREEN)
+        self.red_apples[envs, 0] = self.spawn_apples(envs, RED)
+
+    def spawn_apples(self, envs, code):
+        """
+        Place une pomme sur une case libre tirée uniformément dans
+        chacun des plateaux donnés.
+        :param envs: Indices des plateaux.
+        :param code: GREEN ou RED.
+        :return: Indices des nouvelles pommes (-1 si le plateau est plein).
+        """
+        keys = self.rng.random((len(envs), self.grids.shape[1]))
+        keys[self.grids[envs] != EMPTY] = 2.0
+        cells = np.argmin(keys, axis=1)
+        full = keys[np.arange(len(envs)), cells] > 1.0
+        cells[full] = -1
+        placed = ~full
+        self.grids[envs[placed], cells[placed]] = code
+        return cells
+
+    def _pop_tail(self, envs):
+        """
+        Retire le dernier segment des serpents donnés et libère sa case
+        si elle n'est plus occupée par le segment précédent.
+        """
+        last = (self.head_ptr[envs] + self.lengths[envs] - 1) % self.capacity
+        tails = self.bodies[envs, last]
+        previous = self.bodies[envs, (last - 1) % self.capacity]
+        freed = tails != previous
+        self.grids[envs[freed], tails[freed]] = EMPTY
+        self.lengths[envs] -= 1
+
+    def step(self, actions):
+        """
+        Joue une action sur chaque plateau.
+        Les plateaux terminés (collision ou victoire) sont
+        réinitialisés automatiquement.
+        :param actions: Tableau d'indices d'actions (0 haut, 1 bas,
+        2 gauche, 3 droite), un par plateau.
+        :return: Tuple (grilles, récompenses, terminés). Les grilles sont
+        le tampon interne, écrasé au pas suivant.
+        """
+        envs = np.arange(self.num_envs)
+        heads = self.bodies[envs, self.head_ptr]
+        new_heads = heads + self.deltas[np.asarray(actions)]
+        targets = self.grids[envs, new_heads]
+
+        dead = (targets == WALL) | (targets == SNAKE)
+        moving = envs[~dead]
+
+        # Nouvelle tête puis retrait de la queue
+        ptr = (self.head_ptr[moving] - 1) % self.capacity
+        self.head_ptr[moving] = ptr
+        self.bodies[moving, ptr] = new_heads[moving]
+        self.lengths[moving] += 1
+        self._pop_tail(moving)
+        self.grids[moving, new_heads[moving]] = SNAKE
+
+        ate_green = ~dead & (targets == GREEN)
+        ate_red = ~dead & (targets == RED)
+
+        # Pomme verte : la queue est dupliquée
+        green = envs[ate_green]
+        last = (self.head_ptr[green] + self.lengths[green] - 1) % self.capacity
+        self.bodies[green, (last + 1) % self.capacity] = \
+            self.bodies[green, last]
+        self.lengths[green] += 1
+        self.scores[green] += 1
+        eaten = self.green_apples[green] == new_heads[green, None]
+        self.green_apples[green] = np.where(eaten, -1,
+                                            self.green_apples[green])
+
+        # Pomme rouge : la queue est retirée, mort si plus de corps
+        red = envs[ate_red]
+        starved = self.lengths[red] <= 1
+        dead[red[starved]] = True
+        shrinking = red[~starved]
+        self._pop_tail(shrinking)
+        self.red_apples[red, 0] = -1
+
+        rewards = np.full(self.num_envs, self.rewards["move_without_eating"],
+                          dtype=np.float64)
+        rewards[ate_green] = self.rewards["green_apple"]
+        rewards[ate_red] = self.rewards["red_apple"]
+        rewards[dead] = self.rewards["collision"]
+
+        # Remplacer les pommes mangées
+        if len(green):
+            slot = np.argmax(eaten, axis=1)
+            self.green_apples[green, slot] = self.spawn_apples(green, GREEN)
+        if len(shrinking):
+            self.red_apples[shrinking, 0] = self.spawn_apples(shrinking, RED)
+
+        self.victories = ~dead & (self.lengths >= self.victory_condition)
+        dones = dead | self.victories
+        self.reset_envs(envs[dones])
+        return self.grids, rewards, dones
+
+    def get_vision(self):
+        """
+        Vision de tous les serpents en une seule indexation.
+        :return: Tableau uint8 [plateaux, 4, size + 1] des codes des cases
+        vues depuis chaque tête (haut, bas, gauche, droite), mur compris,
+        complété par des murs.
+        """
+        envs = np.arange(self.num_envs)
+        heads = self.bodies[envs, self.head_ptr]
+        return self.grids[envs[:, None, None], self.rays[heads]]
+
+    def get_body(self, env):
+        """
+        Retourne le corps d'un serpent sous forme de liste de cases (x, y),
+        tête en premier (utile pour le débogage et l'affichage).
+        """
+        slots = (self.head_ptr[env] + np.arange(self.lengths[env])) \
+            % self.capacity
+        x, y = np.divmod(self.bodies[env, slots], self.width)
+        return list(zip((x - 1).tolist(), (y - 1).tolist()))
@@ -0,0 +1,64 @@
+"""
+Sauvegarde en mode journal : base + journal, avec et sans compaction,
+rechargés comme par QLearningAgent.load_model.
+"""
+import os
+import pickle
+import random
+from types import SimpleNamespace
+import pytest
+from src.board import ACTIONS
+from src.checkpoint import LOG_SUFFIX, Checkpointer, replay_log
+from src.q_table import QTable
+
+
+def load(directory, model_name):
+    """Recharge la base puis rejoue son journal."""
+    with open(os.path.join(directory, model_name), "rb") as f:
+        q_table = pickle.load(f)
+    base_states = q_table.num_states
+    replay_log(os.path.join(directory, model_name + LOG_SUFFIX), q_table)
+    return q_table, base_states
+
+
+@pytest.mark.parametrize("compact_ratio", [0.2, 1000.0])
+def test_delta_log_reload(tmp_path, compact_ratio):
+    rng = random.Random(0)
+    agent = SimpleNamespace(q_table=QTable(ACTIONS))
+    for state in range(50):
+        agent.q_table[(state, ACTIONS[0])] = 1.0
+    checkpointer = Checkpointer(agent, "model.pkl", every_sessions=0,
+                                every_seconds=0, delta=True,
+                                compact_ratio=compact_ratio,
+                                directory=str(tmp_path))
+    checkpointer.save()
+    for _ in range(40):
+        for _ in range(30):
+            state = rng.randrange(400)
+            agent.q_table[(state, rng.choice(ACTIONS))] = rng.uniform(-1, 1)
+        checkpointer.save()
+    checkpointer.close()
+    assert checkpointer.error is None
+
+    q_table, base_states = load(str(tmp_path), "model.pkl")
+    assert q_table.to_dict() == agent.q_table.to_dict()
+    if compact_ratio < 1:
+        # Le journal a été fondu dans une base plus récente
+        assert base_states > 50
+    else:
+        assert base_states == 50
+
+
+def test_delta_log_of_another_base_is_ignored(tmp_path):
+    agent = SimpleNamespace(q_table=QTable(ACTIONS))
+    agent.q_table[(1, ACTIONS[0])] = 1.0
+    with Checkpointer(agent, "model.pkl", every_sessions=0, every_seconds=0,
+                      delta=True, directory=str(tmp_path)) as checkpointer:
+        checkpointer.save()
+        agent.q_table[(1, ACTIONS[0])] = 2.0
+    with open(tmp_path / "model.pkl", "rb") as f:
+        q_table = pickle.load(f)
+    q_table.generation += 1
+    assert replay_log(str(tmp_path / ("model.pkl" + LOG_SUFFIX)),
+                      q_table) == 0
+    assert q_table[(1, ACTIONS[0])] == 1.0
@@ -0,0 +1,54 @@
+"""
+Export d'une QTable au format binaire et lecture par MappedQTable.
+"""
+import random
+import numpy as np
+from src.board import ACTIONS
+from src.mapped_q_table import MappedQTable, export_q_table, is_mapped_file
+from src.q_table import QTable
+
+
+def make_table(count=500, seed=0):
+    rng = random.Random(seed)
+    table = QTable(ACTIONS)
+    # États de tailles variées, dont 0 et des clés à octets nuls finaux
+    states = {0, 1 << 40, 255 << 32}
+    while len(states) < count:
+        states.add(rng.getrandbits(rng.randrange(1, 64)))
+    for state in states:
+        table.values[table.intern(state)] = [rng.uniform(-1, 1)
+                                             for _ in ACTIONS]
+    return table
+
+
+def test_export_and_lookup(tmp_path):
+    table = make_table()
+    path = str(tmp_path / "model.qmap")
+    export_q_table(table, path)
+    assert is_mapped_file(path)
+
+    mapped = MappedQTable(path)
+    assert mapped.num_states == table.num_states
+    assert mapped.actions == table.actions
+    for state_id, state in enumerate(table.states):
+        np.testing.assert_array_equal(mapped.values[mapped.intern(state)],
+                                      table.values[state_id])
+
+
+def test_unknown_state_reads_zero_row(tmp_path):
+    table = make_table(count=50)
+    path = str(tmp_path / "model.qmap")
+    export_q_table(table, path)
+
+    mapped = MappedQTable(path)
+    unknown = max(table.states) + 1
+    assert mapped.get_id(unknown) is None
+    assert not mapped.values[mapped.intern(unknown)].any()
+    assert mapped.num_states == table.num_states  # Pas d'insertion
+
+
+def test_to_q_table_round_trip(tmp_path):
+    table = make_table(count=100)
+    path = str(tmp_path / "model.qmap")
+    export_q_table(table, path)
+    assert MappedQTable(path).to_q_table().to_dict() == table.to_dict()
@@ -0,0 +1,62 @@
+"""
+Insertions concurrentes dans la SharedQTable : plusieurs processus
+insèrent les mêmes états en même temps, chaque état doit n'avoir
+qu'un seul emplacement.
+"""
+import multiprocessing
+import random
+from src.board import ACTIONS
+from src.shared_q_table import SharedQTable
+
+STATES = 20000
+WORKERS = 4
+
+
+def insert_all(table, seed):
+    """Insère tous les états dans un ordre propre au processus."""
+    states = list(range(1, STATES + 1))
+    random.Random(seed).shuffle(states)
+    for state in states:
+        slot = table.intern(state)
+        table.values[slot, 0] = state
+    table.add_sessions()
+    table.close()
+
+
+def test_concurrent_insert():
+    table = SharedQTable(ACTIONS, capacity=1 << 16)
+    try:
+        processes = [multiprocessing.Process(target=insert_all,
+                                             args=(table, seed))
+                     for seed in range(WORKERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert [process.exitcode for process in processes] == [0] * WORKERS
+
+        assert table.sessions == WORKERS
+        assert table.num_states == STATES
+        snapshot = table.snapshot()
+        assert sorted(snapshot.states) == list(range(1, STATES + 1))
+        for state in (1, STATES // 2, STATES):
+            slot = table.get_id(state)
+            assert table.values[slot, 0] == state
+            assert snapshot[(state, ACTIONS[0])] == state
+    finally:
+        table.close()
+        table.unlink()
+
+
+def test_get_id_does_not_insert():
+    table = SharedQTable(ACTIONS, capacity=1 << 8)
+    try:
+        assert table.get_id(42) is None
+        assert table.num_states == 0
+        slot = table.intern(42)
+        assert table.get_id(42) == slot
+        assert table.intern(42) == slot
+        assert table.num_states == 1
+    finally:
+        table.close()
+        table.unlink()